@@ -1,21 +1,35 @@
 import os
 import numpy as np
-import librosa
-from faster_whisper import WhisperModel
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from pydub import AudioSegment
 import traceback
 import json
 from dotenv import load_dotenv
-import torch
-from transformers import pipeline
 import cloudinary
 import cloudinary.uploader
 import time
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
-from facial_metrics import FacialMetricsAnalyzer
+import facial_metrics
+from facial_metrics import FacialSessionRegistry
+from audio_utils import ARCHIVE_CODECS, decode_audio, detect_speech, encode_archival, get_duration, speaking_duration
+from pipeline import Pipeline
+from jobs import JobQueue, JobQueueFull
+from transcription import segments_from_dicts, segments_to_dicts, transcribe_chunked
+from whisper_registry import WhisperRegistry, whisper_config_from_env
+from decoding_policy import DecodingPolicy, describe_policy
+from streaming import StreamingSession
+from prosody import analyze_prosody, round_prosody
+from speech_metrics import analyze_delivery, delivery_prompt_facts
+from caching import LRUCache, SingleFlight, SQLiteCache, TieredCache, content_hash
+from gemini_client import CircuitBreaker, GeminiUnavailable, ResilientGeminiClient
+from fake_gemini import FakeGeminiModel
+from models import FAILED, ModelLoader
+from inference_workers import InferencePool, remote_registry
+from upload_outbox import LocalUploadTarget, UploadOutbox
 
 # --- SETUP ---
 load_dotenv()
@@ -34,47 +48,155 @@ try:
 except Exception as e:
     print(f"CRITICAL ERROR: Could not configure Cloudinary. {e}")
 
+GEMINI_MODEL_NAME = 'gemini-2.5-flash'
 gemini_model = None
 try:
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY not found in .env file")
-    genai.configure(api_key=GOOGLE_API_KEY)
-    gemini_model = genai.GenerativeModel('gemini-2.5-flash')
-    print("Gemini AI model 'gemini-2.5-flash' configured successfully.")
+    if os.getenv("GEMINI_FAKE"):
+        # Offline stand-in, e.g. GEMINI_FAKE=1 GEMINI_FAKE_LATENCY=2 GEMINI_FAKE_FAILURE_RATE=0.3
+        GEMINI_MODEL_NAME = 'fake-gemini'
+        upstream_model = FakeGeminiModel(latency=float(os.getenv("GEMINI_FAKE_LATENCY", "0.2")),
+                                         failure_rate=float(os.getenv("GEMINI_FAKE_FAILURE_RATE", "0")))
+    else:
+        GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+        if not GOOGLE_API_KEY:
+            raise ValueError("GOOGLE_API_KEY not found in .env file")
+        genai.configure(api_key=GOOGLE_API_KEY)
+        upstream_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    gemini_model = ResilientGeminiClient(
+        upstream_model,
+        request_timeout=float(os.getenv("GEMINI_REQUEST_TIMEOUT", "20")),
+        deadline=float(os.getenv("GEMINI_DEADLINE", "45")),
+        max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+        acquire_timeout=float(os.getenv("GEMINI_ACQUIRE_TIMEOUT", "5")),
+        max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "2")),
+        breaker=CircuitBreaker(failure_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5")),
+                               reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET", "30")))
+    )
+    print(f"Gemini AI model '{GEMINI_MODEL_NAME}' configured successfully.")
 except Exception as e:
     print(f"CRITICAL ERROR: Could not configure Gemini AI. {e}")
 
-# --- LOCAL WHISPER MODEL LOADING (AT STARTUP) ---
-print("Loading local Whisper model...")
-whisper_model = None
-try:
-    whisper_model = WhisperModel("medium", device="cuda", compute_type="float16")
-    print("Whisper 'medium' model loaded successfully on GPU.")
-except Exception as e:
-    print(f"CRITICAL ERROR: Could not load Whisper model. Trying CPU fallback. {e}")
-    try:
-        whisper_model = WhisperModel("medium", device="cpu", compute_type="int8")
-        print("Whisper 'medium' model loaded successfully on CPU.")
-    except Exception as e2:
-        print(f"CRITICAL ERROR: Failed to load Whisper model on CPU as well. {e2}")
+# --- BACKGROUND MODEL LOADING ---
+# Models load on background threads so the server binds immediately; /health/ready reports
+# when every model has loaded and served a warmup inference.
+# With INFERENCE_WORKERS > 0, Whisper and prosody run in separate worker processes and this
+# process only does I/O and orchestration.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+inference_pool = None
+
+
+def load_whisper():
+    """Loads every configured Whisper size, each behind its own micro-batching scheduler."""
+    global inference_pool
+    config = whisper_config_from_env()
+    if INFERENCE_WORKERS > 0:
+        print(f"Starting {INFERENCE_WORKERS} inference workers with Whisper models {config['models']}...")
+        inference_pool = InferencePool(
+            INFERENCE_WORKERS, config,
+            threads_per_worker=int(os.getenv("INFERENCE_WORKER_THREADS", "4")),
+            task_timeout=float(os.getenv("INFERENCE_TASK_TIMEOUT", "600"))
+        )
+        inference_pool.wait_ready()
+        return remote_registry(inference_pool, config)
+    print(f"Loading local Whisper models {config['models']}...")
+    return WhisperRegistry.load(config)
+
+
+def warmup_whisper(registry):
+    if inference_pool is not None:
+        return  # workers warm up their own models before reporting ready
+    for tier in registry.tiers:
+        segments, info = tier.scheduler.model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1, language="en")
+        list(segments)
+
+
+def run_prosody(samples, speech=None):
+    """Prosody analysis, in an inference worker when the pool is running."""
+    if inference_pool is not None and inference_pool.ready_event.is_set():
+        return inference_pool.call('prosody', samples, speech)
+    return analyze_prosody(samples, speech=speech)
+
+
+def warmup_prosody(_):
+    if INFERENCE_WORKERS > 0:
+        return
+    analyze_prosody(np.random.default_rng(0).standard_normal(16000).astype(np.float32) * 0.1)
+
+
+model_loader = ModelLoader()
+model_loader.register('whisper', load_whisper, warmup_whisper)
+model_loader.register('deepface', facial_metrics.get_deepface, lambda _: facial_metrics.warmup())
+model_loader.register('prosody', lambda: True, warmup_prosody)
+
+
+decoding_policy = DecodingPolicy.from_env()
+
+
+def get_whisper_registry():
+    """The Whisper model registry, or None until the models have loaded and warmed up."""
+    return model_loader.get('whisper')
+
+
+def whisper_unavailable():
+    """Error response while Whisper cannot serve requests, else None."""
+    if get_whisper_registry():
+        return None
+    if model_loader.state('whisper') == FAILED:
+        return jsonify({'error': 'Whisper model not loaded'}), 500
+    return jsonify({'error': 'Whisper model is still loading, try again shortly'}), 503
+
+
+# --- ACOUSTIC RESULT CACHE ---
+# Keyed on the decoded audio, so re-submitting the same recording skips Whisper and prosody
+ACOUSTIC_CACHE_VERSION = "acoustic-v2"
+acoustic_cache = TieredCache(
+    LRUCache(max_entries=int(os.getenv("ACOUSTIC_CACHE_SIZE", "256"))),
+    SQLiteCache(os.getenv("ACOUSTIC_CACHE_DB"), table='acoustic',
+                max_entries=int(os.getenv("ACOUSTIC_CACHE_DB_SIZE", "10000")))
+    if os.getenv("ACOUSTIC_CACHE_DB") else None
+)
+
+
+# --- GEMINI FEEDBACK CACHE ---
+# Identical prompt inputs for the same model get the stored feedback instead of an LLM round-trip
+feedback_cache = TieredCache(
+    LRUCache(max_entries=int(os.getenv("FEEDBACK_CACHE_SIZE", "512"))),
+    SQLiteCache(os.getenv("FEEDBACK_CACHE_DB", os.path.join("cache", "feedback.db")), table='feedback',
+                max_entries=int(os.getenv("FEEDBACK_CACHE_DB_SIZE", "20000")),
+                ttl=int(os.getenv("FEEDBACK_CACHE_TTL", str(7 * 24 * 3600))))
+)
+
+
+def feedback_cache_key(kind, transcript, wpm, pitch_modulation, delivery, facial_metrics=None):
+    """Canonical hash of everything that goes into a feedback prompt."""
+    inputs = {
+        "transcript": " ".join(transcript.split()),
+        "wpm": int(wpm),
+        "pitchModulation": round(float(pitch_modulation), 2),
+        "delivery": delivery,
+        "facial": None if facial_metrics is None else {
+            key: facial_metrics.get(key) for key in
+            ('average_engagement_score', 'average_confidence_score', 'emotion_breakdown', 'dominant_emotion')
+        }
+    }
+    canonical = json.dumps(inputs, sort_keys=True, separators=(',', ':'))
+    return content_hash(GEMINI_MODEL_NAME, kind, canonical)
 
 
 # --- HELPER FUNCTIONS ---
-def analyze_pitch(filepath):
-    """Analyzes the pitch of an audio file."""
-    try:
-        y, sr = librosa.load(filepath, sr=16000)
-        pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-        pitch_values = [p for p in pitches[magnitudes > 0] if p > 0]
-        if len(pitch_values) > 1: return float(np.std(pitch_values))
-        return 0.0
-    except Exception as e:
-        print(f"Could not analyze pitch: {e}")
-        return 0.0
+def delivery_prompt_parts(delivery):
+    """
+    Prompt pieces for the locally measured delivery metrics.
+    With measurements the LLM only gets them as facts; without, it must generate them.
+    """
+    if delivery:
+        return delivery_prompt_facts(delivery), ""
+    return "", """"fillerWordAnalysis": [ { "word": "<string>", "count": <integer> } ],
+      "pauseAnalysis": [ { "type": "<string>", "context": "<string>" } ],
+      """
 
 
-def get_ai_feedback(transcript, wpm, pitch_modulation):
+def get_ai_feedback(transcript, wpm, pitch_modulation, delivery=None):
     """Generates detailed feedback using the Google Gemini API."""
 
     required_keys = {
@@ -83,14 +205,21 @@ def get_ai_feedback(transcript, wpm, pitch_modulation):
         "vocalVarietyAnalysis": {"assessment": "N/A", "recommendation": "N/A"},
         "grammaticalErrors": [],
         "clarityConciseness": [],
-        "fillerWordAnalysis": [],
-        "pauseAnalysis": [],
+        "fillerWordAnalysis": delivery["fillerWordAnalysis"] if delivery else [],
+        "pauseAnalysis": delivery["pauseAnalysis"] if delivery else [],
         "keyImprovements": []
     }
 
     if not gemini_model:
         return {**required_keys, "overallFeedback": "AI analysis service (Gemini) is unavailable."}
 
+    cache_key = feedback_cache_key('speech', transcript, wpm, pitch_modulation, delivery)
+    cached_feedback = feedback_cache.get(cache_key)
+    if cached_feedback is not None:
+        print("Gemini feedback served from cache.")
+        return cached_feedback
+
+    delivery_facts, delivery_schema = delivery_prompt_parts(delivery)
     prompt = f"""
     Act as an expert, highly detailed, and encouraging speech coach named "Smart Speak".
     Your task is to analyze the following speech data from a user. Provide specific, actionable feedback with examples.
@@ -99,6 +228,7 @@ def get_ai_feedback(transcript, wpm, pitch_modulation):
     - Transcript: "{transcript}"
     - Speaking Pace: {wpm} Words Per Minute (Ideal is ~130-160 WPM)
     - Pitch Modulation (Std Dev): {pitch_modulation:.2f} (Good is often > 30)
+    {delivery_facts}
 
     Your analysis MUST be returned as a single, valid JSON object with NO text before or after it.
     The JSON object must have the following exact keys:
@@ -108,9 +238,7 @@ def get_ai_feedback(transcript, wpm, pitch_modulation):
       "confidenceScore": <integer: Score from 0-100 based on fluency, filler words, and pace.>,
       "pacingAnalysis": {{ "assessment": "<string>", "recommendation": "<string>" }},
       "vocalVarietyAnalysis": {{ "assessment": "<string>", "recommendation": "<string>" }},
-      "fillerWordAnalysis": [ {{ "word": "<string>", "count": <integer> }} ],
-      "pauseAnalysis": [ {{ "type": "<string>", "context": "<string>" }} ],
-      "grammaticalErrors": [ {{ "error": "<string>", "example": "<string>", "correction": "<string>" }} ],
+      {delivery_schema}"grammaticalErrors": [ {{ "error": "<string>", "example": "<string>", "correction": "<string>" }} ],
       "clarityConciseness": [ {{ "issue": "<string>", "example": "<string>", "suggestion": "<string>" }} ],
       "keyImprovements": [ {{ "area": "<string>", "action": "<string>" }} ]
     }}
@@ -143,8 +271,15 @@ def get_ai_feedback(transcript, wpm, pitch_modulation):
             if key not in parsed_json:
                 print(f"Warning: Gemini response missing key '{key}'. Using default.")
                 parsed_json[key] = default_value
+        if delivery:
+            parsed_json["fillerWordAnalysis"] = delivery["fillerWordAnalysis"]
+            parsed_json["pauseAnalysis"] = delivery["pauseAnalysis"]
+        feedback_cache.put(cache_key, parsed_json)
         return parsed_json
 
+    except GeminiUnavailable as unavailable:
+        print(f"Gemini unavailable, using fallback feedback: {unavailable}")
+        return {**required_keys, "overallFeedback": "AI analysis is temporarily unavailable. Please try again shortly."}
     except json.JSONDecodeError as json_err:
         print(f"CRITICAL: Failed to parse JSON from Gemini. Error: {json_err}")
         if 'response' in locals(): print(f"--- RAW AI RESPONSE START ---\n{response.text}\n--- RAW AI RESPONSE END ---")
@@ -155,75 +290,262 @@ def get_ai_feedback(transcript, wpm, pitch_modulation):
         return {**required_keys, "overallFeedback": f"Error during AI analysis: {google_error}"}
 
 
+# --- ARCHIVAL UPLOADS ---
+# Recordings are written to an on-disk outbox and uploaded in the background, so a slow or failing
+# Cloudinary never holds up an analysis. The URL is pushed to 'upload:<id>' subscribers when ready.
+def cloudinary_upload(path, public_id):
+    upload_result = cloudinary.uploader.upload(path, resource_type="video", public_id=public_id)
+    return upload_result.get('secure_url')
+
+
+def push_upload_update(record):
+    socketio.emit('audio_upload_update', record, to=f"upload:{record['uploadId']}")
+
+
+LOCAL_UPLOAD_DIR = os.getenv("LOCAL_UPLOAD_DIR", os.path.join("cache", "uploaded"))
+if os.getenv("UPLOAD_TARGET", "cloudinary") == "local":
+    # Offline stand-in, e.g. UPLOAD_TARGET=local UPLOAD_FAKE_LATENCY=3 UPLOAD_FAKE_FAILURE_RATE=0.5
+    upload_target = LocalUploadTarget(LOCAL_UPLOAD_DIR,
+                                      base_url=os.getenv("LOCAL_UPLOAD_BASE_URL", "http://127.0.0.1:5000/uploads/files"),
+                                      latency=float(os.getenv("UPLOAD_FAKE_LATENCY", "0")),
+                                      failure_rate=float(os.getenv("UPLOAD_FAKE_FAILURE_RATE", "0")))
+else:
+    upload_target = cloudinary_upload
+
+# ARCHIVE_CODEC: opus (default), aac or wav
+ARCHIVE_CODEC = os.getenv("ARCHIVE_CODEC", "opus")
+ARCHIVE_BITRATE = os.getenv("ARCHIVE_BITRATE", "24k")
+if ARCHIVE_CODEC not in ARCHIVE_CODECS:
+    print(f"CRITICAL ERROR: Unknown ARCHIVE_CODEC '{ARCHIVE_CODEC}' (expected one of {sorted(ARCHIVE_CODECS)}); archiving WAV.")
+    ARCHIVE_CODEC = "wav"
+
+upload_outbox = UploadOutbox(
+    os.getenv("UPLOAD_OUTBOX_DIR", os.path.join("cache", "outbox")),
+    upload_target,
+    num_workers=int(os.getenv("UPLOAD_WORKERS", "2")),
+    max_attempts=int(os.getenv("UPLOAD_MAX_ATTEMPTS", "8")),
+    backoff_max=float(os.getenv("UPLOAD_BACKOFF_MAX", "300")),
+    on_update=push_upload_update
+)
+
+
+# --- ANALYSIS PIPELINE ---
+pipeline_executor = ThreadPoolExecutor(max_workers=int(os.getenv("PIPELINE_WORKERS", "8")),
+                                       thread_name_prefix="pipeline")
+# With inference workers, recordings longer than CHUNKED_TRANSCRIPTION_SECONDS are split at silences
+# so the chunks spread across the worker processes; a separate pool so chunks never wait behind the
+# stages that submit them. In-process the batched scheduler already decodes a long clip's voiced
+# windows together, so chunking there would only add overhead.
+CHUNKED_TRANSCRIPTION_SECONDS = float(os.getenv("CHUNKED_TRANSCRIPTION_SECONDS", "90"))
+TRANSCRIPTION_CHUNK_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "30"))
+chunk_executor = ThreadPoolExecutor(max_workers=int(os.getenv("CHUNK_WORKERS", "16")),
+                                    thread_name_prefix="transcribe-chunk")
+
+
+def no_speech_analysis():
+    """Analysis payload returned when no speech was detected."""
+    return {
+        "overallFeedback": 'Recording was too short or silent.', "confidenceScore": 0,
+        "pacingAnalysis": {"assessment": "N/A", "recommendation": "N/A"},
+        "vocalVarietyAnalysis": {"assessment": "N/A", "recommendation": "N/A"},
+        "grammaticalErrors": [], "clarityConciseness": [],
+        "fillerWordAnalysis": [], "pauseAnalysis": [], "keyImprovements": []
+    }
+
+
+# Double submits and client retries of the same recording attach to the analysis already running
+analysis_flights = SingleFlight()
+
+
+def run_speech_analysis(audio_bytes, user_id, facial_metrics_summary=None, on_stage_complete=None):
+    """
+    Runs the full speech analysis for one recording.
+    Upload, transcription and prosody run concurrently; only the feedback stage waits
+    for the transcript and prosody results. on_stage_complete(name, seconds) reports progress
+    (only for the request that actually runs the pipeline, not for coalesced duplicates).
+    """
+    flight_key = content_hash(user_id or "", audio_bytes,
+                              json.dumps(facial_metrics_summary, sort_keys=True, default=str))
+    metrics, shared = analysis_flights.do(flight_key, lambda: analyze_samples(
+        decode_audio(audio_bytes), user_id, feedback_fn_for(facial_metrics_summary), on_stage_complete))
+    if shared:
+        print("Duplicate analysis request joined the one already in flight.")
+    # Each caller gets its own top-level dict to add fields to
+    return dict(metrics)
+
+
+def analyze_samples(samples, user_id, feedback_fn, on_stage_complete=None, transcribe_fn=None,
+                    transcription_model=None, transcription_policy=None):
+    """
+    Runs the analysis pipeline on an already decoded 16 kHz buffer.
+    transcribe_fn() can supply the transcript segments instead of a full Whisper pass (live streams);
+    transcription_model/transcription_policy describe the Whisper tier and decoding that produced them.
+    """
+    duration_seconds = get_duration(samples)
+    request_id = uuid.uuid4().hex[:12]
+    cache_key = None if transcribe_fn else content_hash(ACOUSTIC_CACHE_VERSION, samples.tobytes())
+    cached = acoustic_cache.get(cache_key) if cache_key else None
+    transcription_meta = {
+        'whisperModel': cached['whisperModel'] if cached else transcription_model,
+        'decodingPolicy': cached.get('decodingPolicy') if cached else transcription_policy
+    }
+
+    def upload_stage():
+        # Unique per analysis: two recordings in the same second must not overwrite each other
+        public_id = f"smart-speak/{user_id or 'guest'}/{int(time.time())}-{request_id}"
+        data, encoding = encode_archival(samples, ARCHIVE_CODEC, ARCHIVE_BITRATE)
+        upload_id = upload_outbox.enqueue(data, public_id, suffix=encoding['suffix'], meta=encoding)
+        return {'uploadId': upload_id, 'status': 'pending', 'codec': encoding['codec'],
+                'bitrate': encoding['bitrate'], 'bytes': encoding['bytes']}
+
+    def vad_stage():
+        return detect_speech(samples)
+
+    def transcribe_stage(vad):
+        if cached:
+            return segments_from_dicts(cached['segments'])
+        if transcribe_fn:
+            return transcribe_fn()
+        if not vad:
+            return []  # nothing above the energy floor; skip Whisper entirely
+        registry = get_whisper_registry()
+        tier = registry.select(duration_seconds)
+        queue_depth = registry.queue_depth()
+        policy_name, decode_options = decoding_policy.choose(queue_depth, duration_seconds)
+        transcription_meta['whisperModel'] = tier.name
+        transcription_meta['decodingPolicy'] = describe_policy(policy_name, decode_options, queue_depth)
+        if inference_pool is not None and duration_seconds > CHUNKED_TRANSCRIPTION_SECONDS:
+            return transcribe_chunked(tier.scheduler.transcribe, samples, chunk_executor, TRANSCRIPTION_CHUNK_SECONDS,
+                                      language="en", word_timestamps=True, **decode_options)
+        return tier.scheduler.transcribe(samples, language="en", word_timestamps=True, **decode_options)
+
+    def prosody_stage(vad):
+        if cached:
+            return cached['prosody']
+        return run_prosody(samples, vad)
+
+    def delivery_stage(transcribe):
+        return analyze_delivery(transcribe)
+
+    def feedback_stage(vad, transcribe, prosody, delivery):
+        transcript = "".join(segment.text for segment in transcribe).strip()
+        word_count = len(transcript.split())
+        if not transcript or word_count < 1:
+            return None
+        # Pace over speaking time, so lead-in and trailing silence don't drag WPM down
+        speaking_seconds = speaking_duration(vad) or duration_seconds
+        wpm = (word_count / speaking_seconds) * 60 if speaking_seconds > 0 else 0
+        print("Getting detailed AI feedback from Gemini...")
+        ai_analysis = feedback_fn(transcript, int(round(wpm)), prosody['pitch_modulation'], delivery)
+        print("AI feedback received.")
+        return {'transcript': transcript, 'wpm': wpm, 'analysis': ai_analysis}
+
+    analysis_pipeline = Pipeline(pipeline_executor)
+    analysis_pipeline.add_stage('upload', upload_stage)
+    analysis_pipeline.add_stage('vad', vad_stage)
+    analysis_pipeline.add_stage('transcribe', transcribe_stage, depends_on=('vad',))
+    analysis_pipeline.add_stage('prosody', prosody_stage, depends_on=('vad',))
+    analysis_pipeline.add_stage('delivery', delivery_stage, depends_on=('transcribe',))
+    analysis_pipeline.add_stage('feedback', feedback_stage, depends_on=('vad', 'transcribe', 'prosody', 'delivery'))
+    results = analysis_pipeline.run(on_stage_complete=on_stage_complete)
+    print(f"Pipeline stage timings (s) for {request_id}: {analysis_pipeline.timings}")
+    if cache_key and not cached:
+        acoustic_cache.put(cache_key, {'segments': segments_to_dicts(results['transcribe']),
+                                       'prosody': results['prosody'],
+                                       'whisperModel': transcription_meta['whisperModel'],
+                                       'decodingPolicy': transcription_meta['decodingPolicy']})
+
+    feedback = results['feedback']
+    if feedback is None:
+        return {'transcript': "No speech detected.", 'wpm': 0, 'pitchModulation': 0.0, 'duration': duration_seconds,
+                'audioURL': None, 'audioUpload': results['upload'], 'prosody': round_prosody(results['prosody']),
+                'whisperModel': transcription_meta['whisperModel'],
+                'decodingPolicy': transcription_meta['decodingPolicy'], 'analysis': no_speech_analysis()}
+
+    return {
+        'transcript': feedback['transcript'], 'wpm': int(round(feedback['wpm'])),
+        'pitchModulation': float(round(results['prosody']['pitch_modulation'], 2)),
+        'duration': float(round(duration_seconds, 2)),
+        'speakingDuration': float(round(speaking_duration(results['vad']), 2)),
+        'audioURL': None,
+        'audioUpload': results['upload'],
+        'prosody': round_prosody(results['prosody']),
+        'delivery': results['delivery'],
+        'whisperModel': transcription_meta['whisperModel'],
+        'decodingPolicy': transcription_meta['decodingPolicy'],
+        'analysis': feedback['analysis']
+    }
+
+
+def feedback_fn_for(facial_metrics_summary):
+    """Picks the Gemini feedback function for a request, binding facial metrics if present."""
+    if facial_metrics_summary is None:
+        return get_ai_feedback
+    return lambda transcript, wpm, pitch, delivery: get_ai_feedback_with_facial(
+        transcript, wpm, pitch, facial_metrics_summary, delivery)
+
+
 # --- API ROUTES ---
 @app.route('/')
 def health_check():
     return jsonify({"status": "ok"})
 
 
-@app.route('/analyze', methods=['POST'])
-def analyze_speech():
-    if 'audio' not in request.files: return jsonify({'error': 'No audio file found'}), 400
-    if not whisper_model: return jsonify({'error': 'Whisper model not loaded'}), 500
+@app.route('/health/live')
+def liveness_check():
+    """The process is up and serving HTTP; says nothing about models."""
+    return jsonify({"status": "ok"})
 
-    user_id = request.form.get('uid')
-    audio_file = request.files['audio']
-    uploads_dir = 'uploads'
-    if not os.path.exists(uploads_dir): os.makedirs(uploads_dir)
-    filepath = os.path.join(uploads_dir, f"temp_{int(time.time())}.wav")
-    audio_file.save(filepath)
 
-    audio_url = None
-    try:
-        sound = AudioSegment.from_file(filepath)
-        sound = sound.set_channels(1).set_frame_rate(16000)
-        sound.export(filepath, format="wav")
+@app.route('/health/ready')
+def readiness_check():
+    """Ready only once every model has loaded and completed its warmup inference."""
+    ready = model_loader.is_ready()
+    registry = get_whisper_registry()
+    return jsonify({"status": "ready" if ready else "not_ready", "models": model_loader.status(),
+                    "whisper": registry.status() if registry else None,
+                    "inferenceWorkers": inference_pool.status() if inference_pool else None,
+                    "facialSessions": facial_sessions.stats()}), 200 if ready else 503
 
-        public_id = f"smart-speak/{user_id}/{int(time.time())}" if user_id else f"smart-speak/guest/{int(time.time())}"
-        upload_result = cloudinary.uploader.upload(filepath, resource_type="video", public_id=public_id)
-        audio_url = upload_result.get('secure_url')
 
-        segments, info = whisper_model.transcribe(filepath, beam_size=5, language="en", vad_filter=True)
-        transcript = "".join(segment.text for segment in segments).strip()
+@app.route('/cache/stats')
+def cache_stats():
+    """Hit/miss counters and sizes for the result caches."""
+    return jsonify({"acoustic": acoustic_cache.stats(), "feedback": feedback_cache.stats(),
+                    "gemini": gemini_model.stats() if gemini_model else None,
+                    "analysisFlights": analysis_flights.stats()})
 
-        word_count = len(transcript.split())
-        duration_seconds = len(sound) / 1000.0
-
-        analysis_fallback = {
-            "overallFeedback": 'Recording was too short or silent.', "confidenceScore": 0,
-            "pacingAnalysis": {"assessment": "N/A", "recommendation": "N/A"},
-            "vocalVarietyAnalysis": {"assessment": "N/A", "recommendation": "N/A"},
-            "grammaticalErrors": [], "clarityConciseness": [],
-            "fillerWordAnalysis": [], "pauseAnalysis": [], "keyImprovements": []
-        }
 
-        if not transcript or word_count < 1:
-            return jsonify(
-                {'transcript': "No speech detected.", 'wpm': 0, 'pitchModulation': 0.0, 'duration': duration_seconds,
-                 'audioURL': audio_url, 'analysis': analysis_fallback})
+@app.route('/uploads/<upload_id>')
+def get_audio_upload(upload_id):
+    """Archival upload state; 'url' is set once the background upload has finished."""
+    record = upload_outbox.get(upload_id)
+    if record is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(record)
 
-        wpm = (word_count / duration_seconds) * 60 if duration_seconds > 0 else 0
-        pitch_modulation = analyze_pitch(filepath)
 
-        print("Getting detailed AI feedback from Gemini...")
-        ai_analysis = get_ai_feedback(transcript, int(round(wpm)), pitch_modulation)
-        print("AI feedback received.")
+@app.route('/uploads/files/<path:name>')
+def get_local_upload(name):
+    """Serves recordings stored by the local upload target (UPLOAD_TARGET=local)."""
+    return send_from_directory(os.path.abspath(LOCAL_UPLOAD_DIR), name)
 
-        metrics = {
-            'transcript': transcript, 'wpm': int(round(wpm)),
-            'pitchModulation': float(round(pitch_modulation, 2)),
-            'duration': float(round(duration_seconds, 2)),
-            'audioURL': audio_url,
-            'analysis': ai_analysis
-        }
 
+@app.route('/analyze', methods=['POST'])
+def analyze_speech():
+    if 'audio' not in request.files: return jsonify({'error': 'No audio file found'}), 400
+    unavailable = whisper_unavailable()
+    if unavailable: return unavailable
+
+    user_id = request.form.get('uid')
+    audio_file = request.files['audio']
+
+    try:
+        metrics = run_speech_analysis(audio_file.read(), user_id)
         return jsonify(metrics)
     except Exception as e:
         print(f"An unexpected error occurred: {traceback.format_exc()}")
         return jsonify({'error': 'An internal server error occurred.', 'details': str(e)}), 500
-    finally:
-        if os.path.exists(filepath):
-            os.remove(filepath)
 
 
 # --- FACIAL ANALYSIS ROUTES & WEBSOCKET HANDLERS ---
@@ -232,74 +554,28 @@ def analyze_with_facial_metrics():
     """Enhanced analyze endpoint that accepts facial metrics summary"""
     if 'audio' not in request.files:
         return jsonify({'error': 'No audio file found'}), 400
+    unavailable = whisper_unavailable()
+    if unavailable:
+        return unavailable
     
     user_id = request.form.get('uid')
     audio_file = request.files['audio']
     facial_metrics_json = request.form.get('facialMetrics', '{}')
     
-    uploads_dir = 'uploads'
-    if not os.path.exists(uploads_dir):
-        os.makedirs(uploads_dir)
-    filepath = os.path.join(uploads_dir, f"temp_{int(time.time())}.wav")
-    audio_file.save(filepath)
-    
-    audio_url = None
     try:
         facial_metrics_summary = json.loads(facial_metrics_json) if facial_metrics_json else {}
         
-        sound = AudioSegment.from_file(filepath)
-        sound = sound.set_channels(1).set_frame_rate(16000)
-        sound.export(filepath, format="wav")
-        
-        public_id = f"smart-speak/{user_id}/{int(time.time())}" if user_id else f"smart-speak/guest/{int(time.time())}"
-        upload_result = cloudinary.uploader.upload(filepath, resource_type="video", public_id=public_id)
-        audio_url = upload_result.get('secure_url')
-        
-        segments, info = whisper_model.transcribe(filepath, beam_size=5, language="en", vad_filter=True)
-        transcript = "".join(segment.text for segment in segments).strip()
-        
-        word_count = len(transcript.split())
-        duration_seconds = len(sound) / 1000.0
-        
-        if not transcript or word_count < 1:
-            return jsonify({
-                'transcript': "No speech detected.", 'wpm': 0, 'pitchModulation': 0.0,
-                'duration': duration_seconds, 'audioURL': audio_url,
-                'facialMetrics': facial_metrics_summary,
-                'analysis': {
-                    "overallFeedback": 'Recording was too short or silent.',
-                    "confidenceScore": 0, "pacingAnalysis": {"assessment": "N/A", "recommendation": "N/A"},
-                    "vocalVarietyAnalysis": {"assessment": "N/A", "recommendation": "N/A"},
-                    "grammaticalErrors": [], "clarityConciseness": [],
-                    "fillerWordAnalysis": [], "pauseAnalysis": [], "keyImprovements": []
-                }
-            })
-        
-        wpm = (word_count / duration_seconds) * 60 if duration_seconds > 0 else 0
-        pitch_modulation = analyze_pitch(filepath)
-        
         # Enhanced feedback with facial metrics
-        ai_analysis = get_ai_feedback_with_facial(transcript, int(round(wpm)), pitch_modulation, facial_metrics_summary)
-        
-        metrics = {
-            'transcript': transcript, 'wpm': int(round(wpm)),
-            'pitchModulation': float(round(pitch_modulation, 2)),
-            'duration': float(round(duration_seconds, 2)),
-            'audioURL': audio_url,
-            'facialMetrics': facial_metrics_summary,
-            'analysis': ai_analysis
-        }
+        metrics = run_speech_analysis(audio_file.read(), user_id, facial_metrics_summary)
+        metrics['facialMetrics'] = facial_metrics_summary
         
         return jsonify(metrics)
     except Exception as e:
         print(f"An unexpected error occurred: {traceback.format_exc()}")
         return jsonify({'error': 'An internal server error occurred.', 'details': str(e)}), 500
-    finally:
-        if os.path.exists(filepath):
-            os.remove(filepath)
 
 
-def get_ai_feedback_with_facial(transcript, wpm, pitch_modulation, facial_metrics):
+def get_ai_feedback_with_facial(transcript, wpm, pitch_modulation, facial_metrics, delivery=None):
     """Enhanced feedback that includes facial metrics analysis"""
     
     required_keys = {
@@ -308,12 +584,20 @@ def get_ai_feedback_with_facial(transcript, wpm, pitch_modulation, facial_metric
         "vocalVarietyAnalysis": {"assessment": "N/A", "recommendation": "N/A"},
         "facialAnalysis": {"assessment": "N/A", "recommendation": "N/A"},
         "grammaticalErrors": [], "clarityConciseness": [],
-        "fillerWordAnalysis": [], "pauseAnalysis": [], "keyImprovements": []
+        "fillerWordAnalysis": delivery["fillerWordAnalysis"] if delivery else [],
+        "pauseAnalysis": delivery["pauseAnalysis"] if delivery else [],
+        "keyImprovements": []
     }
     
     if not gemini_model:
         return {**required_keys, "overallFeedback": "AI analysis service (Gemini) is unavailable."}
     
+    cache_key = feedback_cache_key('speech+facial', transcript, wpm, pitch_modulation, delivery, facial_metrics or {})
+    cached_feedback = feedback_cache.get(cache_key)
+    if cached_feedback is not None:
+        print("Gemini facial feedback served from cache.")
+        return cached_feedback
+    
     facial_context = ""
     if facial_metrics:
         avg_engagement = facial_metrics.get('average_engagement_score', 0)
@@ -328,6 +612,7 @@ def get_ai_feedback_with_facial(transcript, wpm, pitch_modulation, facial_metric
         - Emotion Breakdown: {json.dumps(emotion_breakdown)}
         """
     
+    delivery_facts, delivery_schema = delivery_prompt_parts(delivery)
     prompt = f"""
     Act as an expert, highly detailed, and encouraging speech coach named "Smart Speak".
     Your task is to analyze the following speech and facial data from a user. Provide specific, actionable feedback.
@@ -336,6 +621,7 @@ def get_ai_feedback_with_facial(transcript, wpm, pitch_modulation, facial_metric
     - Transcript: "{transcript}"
     - Speaking Pace: {wpm} Words Per Minute (Ideal is ~130-160 WPM)
     - Pitch Modulation (Std Dev): {pitch_modulation:.2f} (Good is often > 30)
+    {delivery_facts}
     {facial_context}
 
     Your analysis MUST be returned as a single, valid JSON object with NO text before or after it.
@@ -347,9 +633,7 @@ def get_ai_feedback_with_facial(transcript, wpm, pitch_modulation, facial_metric
       "pacingAnalysis": {{ "assessment": "<string>", "recommendation": "<string>" }},
       "vocalVarietyAnalysis": {{ "assessment": "<string>", "recommendation": "<string>" }},
       "facialAnalysis": {{ "assessment": "<string>", "recommendation": "<string>" }},
-      "fillerWordAnalysis": [ {{ "word": "<string>", "count": <integer> }} ],
-      "pauseAnalysis": [ {{ "type": "<string>", "context": "<string>" }} ],
-      "grammaticalErrors": [ {{ "error": "<string>", "example": "<string>", "correction": "<string>" }} ],
+      {delivery_schema}"grammaticalErrors": [ {{ "error": "<string>", "example": "<string>", "correction": "<string>" }} ],
       "clarityConciseness": [ {{ "issue": "<string>", "example": "<string>", "suggestion": "<string>" }} ],
       "keyImprovements": [ {{ "area": "<string>", "action": "<string>" }} ]
     }}
@@ -374,13 +658,77 @@ def get_ai_feedback_with_facial(transcript, wpm, pitch_modulation, facial_metric
         for key, default_value in required_keys.items():
             if key not in parsed_json:
                 parsed_json[key] = default_value
+        if delivery:
+            parsed_json["fillerWordAnalysis"] = delivery["fillerWordAnalysis"]
+            parsed_json["pauseAnalysis"] = delivery["pauseAnalysis"]
+        feedback_cache.put(cache_key, parsed_json)
         return parsed_json
     
+    except GeminiUnavailable as unavailable:
+        print(f"Gemini unavailable, using fallback facial feedback: {unavailable}")
+        return {**required_keys, "overallFeedback": "AI analysis is temporarily unavailable. Please try again shortly."}
     except Exception as e:
         print(f"CRITICAL: Failed to get facial feedback from Gemini. Error: {e}")
         return {**required_keys, "overallFeedback": f"Error during AI analysis: {str(e)}"}
 
 
+# --- ASYNCHRONOUS ANALYSIS JOBS ---
+def process_analysis_job(payload, report_stage):
+    """Job handler: runs the analysis pipeline for a queued submission."""
+    facial_metrics_summary = payload.get('facialMetrics')
+    metrics = run_speech_analysis(payload['audio'], payload.get('uid'), facial_metrics_summary,
+                                  on_stage_complete=report_stage)
+    if facial_metrics_summary is not None:
+        metrics['facialMetrics'] = facial_metrics_summary
+    return metrics
+
+
+def push_job_update(snapshot):
+    """Pushes job state to every client subscribed to the job's room."""
+    socketio.emit('analysis_job_update', snapshot, to=snapshot['jobId'])
+
+
+analysis_jobs = JobQueue(
+    process_analysis_job,
+    num_workers=int(os.getenv("ANALYSIS_JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("ANALYSIS_JOB_QUEUE_SIZE", "32")),
+    result_ttl=int(os.getenv("ANALYSIS_JOB_RESULT_TTL", "600")),
+    on_update=push_job_update
+)
+
+
+@app.route('/analyze/jobs', methods=['POST'])
+def submit_analysis_job():
+    """Queues an analysis and returns a job id immediately."""
+    if 'audio' not in request.files: return jsonify({'error': 'No audio file found'}), 400
+    unavailable = whisper_unavailable()
+    if unavailable: return unavailable
+
+    try:
+        facial_metrics_json = request.form.get('facialMetrics')
+        payload = {
+            'audio': request.files['audio'].read(),
+            'uid': request.form.get('uid'),
+            'facialMetrics': json.loads(facial_metrics_json) if facial_metrics_json else None
+        }
+        job_id = analysis_jobs.submit(payload)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    except json.JSONDecodeError as e:
+        return jsonify({'error': 'Invalid facialMetrics JSON', 'details': str(e)}), 400
+
+    return jsonify({'jobId': job_id, 'status': 'queued'}), 202
+
+
+@app.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Polling fallback for clients that do not use the socket push."""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
 # --- WEBSOCKET EVENTS ---
 @socketio.on('connect')
 def handle_connect():
@@ -393,44 +741,194 @@ def handle_connect():
 def handle_disconnect():
     """Client disconnects from WebSocket"""
     print(f"Client disconnected: {request.sid}")
+    with audio_streams_lock:
+        abandoned = [audio_streams.pop(key) for key in [key for key in audio_streams if key[0] == request.sid]]
+    for session in abandoned:
+        session.close()
+    facial_sessions.drop_connection(request.sid)
+
+
+@socketio.on('subscribe_analysis_job')
+def handle_subscribe_job(data):
+    """Subscribe this client to progress/result pushes for an analysis job"""
+    job_id = data.get('jobId')
+    job = analysis_jobs.get(job_id) if job_id else None
+    if job is None:
+        emit('analysis_job_error', {'jobId': job_id, 'error': 'Job not found'})
+        return
+    join_room(job_id)
+    emit('analysis_job_update', job)
+
+
+@socketio.on('subscribe_audio_upload')
+def handle_subscribe_upload(data):
+    """Subscribe to the archival upload of a recording; the record is pushed once it has a URL"""
+    upload_id = data.get('uploadId')
+    record = upload_outbox.get(upload_id) if upload_id else None
+    if record is None:
+        emit('audio_upload_error', {'uploadId': upload_id, 'error': 'Upload not found'})
+        return
+    join_room(f"upload:{upload_id}")
+    if record['status'] != 'pending':
+        emit('audio_upload_update', record)
+
+
+# --- LIVE STREAMING TRANSCRIPTION ---
+audio_streams = {}
+audio_streams_lock = threading.Lock()
+# Separate from pipeline_executor: finalizing a stream runs a pipeline that waits on that pool
+stream_executor = ThreadPoolExecutor(max_workers=int(os.getenv("STREAM_WORKERS", "4")),
+                                     thread_name_prefix="audio-stream")
+
+
+def _stream_key(stream_id):
+    return (request.sid, stream_id)
+
+
+def _push_partial_transcript(session, sid):
+    state = session.update()
+    if state:
+        socketio.emit('partial_transcript', state, to=sid)
+
+
+def _finish_audio_stream(session, sid, user_id, facial_metrics_summary):
+    try:
+        # Drain the decoder first so VAD, prosody and the archive see the last chunk too
+        session.finish_input()
+        metrics = analyze_samples(session.audio(), user_id, feedback_fn_for(facial_metrics_summary),
+                                  transcribe_fn=session.finalize, transcription_model=session.model_name,
+                                  transcription_policy=session.decoding_policy)
+        if facial_metrics_summary is not None:
+            metrics['facialMetrics'] = facial_metrics_summary
+        socketio.emit('audio_stream_result', {'streamId': session.stream_id, 'metrics': metrics}, to=sid)
+    except Exception as e:
+        print(f"Error finalizing audio stream: {traceback.format_exc()}")
+        socketio.emit('audio_stream_error', {'streamId': session.stream_id, 'error': str(e)}, to=sid)
+
+
+@socketio.on('start_audio_stream')
+def handle_start_audio_stream(data):
+    """Open a live transcription stream; chunks follow as 'audio_chunk' events"""
+    registry = get_whisper_registry()
+    if not registry:
+        emit('audio_stream_error', {'error': 'Whisper model not loaded'})
+        return
+    # Clip length is unknown up front, so live streams are routed on load alone
+    tier = registry.select()
+    queue_depth = registry.queue_depth()
+    policy_name, decode_options = decoding_policy.choose(queue_depth)
+    stream_id = data.get('streamId') or uuid.uuid4().hex
+    audio_format = data.get('format', 'pcm16')
+    if audio_format not in ('pcm16', 'webm', 'ogg'):
+        emit('audio_stream_error', {'streamId': stream_id, 'error': f"Unsupported audio format '{audio_format}'"})
+        return
+
+    session = StreamingSession(
+        stream_id,
+        lambda samples: tier.scheduler.transcribe(samples, language="en", word_timestamps=True, **decode_options),
+        audio_format=audio_format,
+        min_update_seconds=float(os.getenv("STREAM_UPDATE_SECONDS", "3")),
+        user_id=data.get('uid'),
+        model_name=tier.name,
+        decoding_policy=describe_policy(policy_name, decode_options, queue_depth)
+    )
+    with audio_streams_lock:
+        audio_streams[_stream_key(stream_id)] = session
+    emit('audio_stream_started', {'streamId': stream_id, 'format': audio_format})
+
+
+@socketio.on('audio_chunk')
+def handle_audio_chunk(data):
+    """Append recorded audio and transcribe incrementally in the background"""
+    session = audio_streams.get(_stream_key(data.get('streamId')))
+    chunk = data.get('chunk')
+    if session is None or not chunk:
+        emit('audio_stream_error', {'streamId': data.get('streamId'), 'error': 'Unknown stream or empty chunk'})
+        return
+    if session.add_chunk(chunk):
+        stream_executor.submit(_push_partial_transcript, session, request.sid)
+
+
+@socketio.on('stop_audio_stream')
+def handle_stop_audio_stream(data):
+    """Finish a stream: transcribe the last chunk, then compute WPM/pitch and feedback"""
+    with audio_streams_lock:
+        session = audio_streams.pop(_stream_key(data.get('streamId')), None)
+    if session is None:
+        emit('audio_stream_error', {'streamId': data.get('streamId'), 'error': 'Unknown stream'})
+        return
+    facial_metrics_summary = data.get('facialMetrics')
+    if isinstance(facial_metrics_summary, str):
+        facial_metrics_summary = json.loads(facial_metrics_summary) if facial_metrics_summary else None
+    stream_executor.submit(_finish_audio_stream, session, request.sid, data.get('uid') or session.user_id,
+                             facial_metrics_summary)
+
+
+facial_sessions = FacialSessionRegistry(
+    max_sessions=int(os.getenv("FACIAL_MAX_SESSIONS", "200")),
+    idle_ttl=float(os.getenv("FACIAL_SESSION_IDLE_TTL", "300"))
+)
 
 
 @socketio.on('start_facial_analysis')
 def handle_start_analysis(data):
     """Initialize facial analysis for a session"""
     session_id = data.get('sessionId')
-    analyzer = FacialMetricsAnalyzer()
-    analyzer.reset_session()
+    facial_sessions.start(request.sid, session_id)
     print(f"Started facial analysis for session: {session_id}")
     emit('analysis_started', {'sessionId': session_id, 'status': 'ready'})
 
 
+def _drain_frames(session, sid, session_id):
+    """Analyze the newest waiting frame until the mailbox is empty; one drainer per session"""
+    while True:
+        frame_data = session.take()
+        if frame_data is None:
+            return
+        try:
+            started = time.perf_counter()
+            with session.lock:
+                metrics = session.analyzer.analyze_frame(frame_data)
+                # O(1) with running aggregates, so the live summary rides along with every frame
+                summary = session.analyzer.get_session_summary() if metrics else None
+            session.record_analysis(time.perf_counter() - started)
+            pacing = session.pacing()
+
+            if metrics:
+                socketio.emit('frame_metrics', {
+                    'sessionId': session_id,
+                    'metrics': metrics,
+                    'summary': summary,
+                    'pacing': pacing,
+                    'timestamp': metrics['timestamp']
+                }, to=sid)
+            else:
+                socketio.emit('frame_skipped', {'sessionId': session_id, 'reason': 'No face detected',
+                                                'pacing': pacing}, to=sid)
+        except Exception as e:
+            print(f"Error processing frame: {e}")
+            socketio.emit('frame_error', {'error': str(e)}, to=sid)
+
+
 @socketio.on('process_frame')
 def handle_process_frame(data):
-    """Process a video frame for facial metrics"""
-    try:
-        frame_base64 = data.get('frame')
-        session_id = data.get('sessionId')
-        
-        if not frame_base64:
-            emit('frame_error', {'error': 'No frame provided'})
-            return
-        
-        analyzer = FacialMetricsAnalyzer()
-        metrics = analyzer.analyze_frame(frame_base64)
-        
-        if metrics:
-            emit('frame_metrics', {
-                'sessionId': session_id,
-                'metrics': metrics,
-                'timestamp': metrics['timestamp']
-            })
-        else:
-            emit('frame_skipped', {'sessionId': session_id, 'reason': 'No face detected'})
+    """
+    Process a video frame for facial metrics
+    Latest frame wins: frames arriving while one is being analyzed replace each other in the
+    session's mailbox and only the newest is analyzed next. Every result carries 'pacing',
+    including the targetFps the client should send at.
+    """
+    # Binary JPEG/WebP (bytes) from current clients, base64 data URL from older ones
+    frame_data = data.get('frame')
+    session_id = data.get('sessionId')
     
-    except Exception as e:
-        print(f"Error processing frame: {e}")
-        emit('frame_error', {'error': str(e)})
+    if not frame_data:
+        emit('frame_error', {'error': 'No frame provided'})
+        return
+    
+    session = facial_sessions.get(request.sid, session_id)
+    if session.offer(frame_data):
+        _drain_frames(session, request.sid, session_id)
 
 
 @socketio.on('end_facial_analysis')
@@ -438,8 +936,11 @@ def handle_end_analysis(data):
     """Finalize facial analysis and get session summary"""
     try:
         session_id = data.get('sessionId')
-        analyzer = FacialMetricsAnalyzer()
-        summary = analyzer.get_session_summary()
+        session = facial_sessions.end(request.sid, session_id)
+        summary = None
+        if session is not None:
+            with session.lock:
+                summary = session.analyzer.get_session_summary()
         
         print(f"Ended facial analysis for session: {session_id}")
         emit('analysis_complete', {
@@ -452,7 +953,12 @@ def handle_end_analysis(data):
         emit('analysis_error', {'error': str(e)})
 
 
+# Background threads (model loading, uploads, analysis jobs) start only when run as the server:
+# 'spawn' inference workers re-import this file as __mp_main__ and must not start any of them.
 if __name__ == '__main__':
+    model_loader.start()
+    upload_outbox.start()
+    analysis_jobs.start()
     socketio.run(app, host='0.0.0.0', port=5000, debug=False)
 
 
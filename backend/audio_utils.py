@@ -0,0 +1,260 @@
+"""
+Audio Utilities Module
+Decodes an uploaded recording once into a 16 kHz mono buffer shared by every analysis stage
+"""
+
+import io
+import threading
+import wave
+import numpy as np
+from pydub import AudioSegment
+
+try:
+    import av  # PyAV, already pulled in by faster-whisper
+except ImportError:
+    av = None
+
+
+SAMPLE_RATE = 16000
+
+# Energy VAD: 20 ms frames, speech is within SILENCE_DB of the loudest frame and above an absolute floor
+VAD_FRAME_SECONDS = 0.02
+SILENCE_DB = 35.0
+VAD_FLOOR = 1e-3
+MIN_SPEECH_SECONDS = 0.1
+MIN_GAP_SECONDS = 0.3
+
+
+def decode_audio(data):
+    """
+    Decode raw upload bytes into a 16 kHz mono float32 numpy array in [-1, 1]
+    This is the only decode per request - Whisper, pitch and duration all reuse it
+    Decodes in process with PyAV; pydub (an ffmpeg subprocess) is only the fallback
+    """
+    if av is not None:
+        try:
+            return _decode_in_process(data)
+        except Exception as e:
+            print(f"In-process decode failed, falling back to ffmpeg: {e}")
+    return _decode_with_pydub(data)
+
+
+def _decode_in_process(data):
+    """webm/opus, ogg, wav, mp4... straight from memory, resampled to 16 kHz mono float while decoding"""
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+    chunks = []
+    with av.open(io.BytesIO(data), mode="r") as container:
+        stream = container.streams.audio[0]
+        for frame in container.decode(stream):
+            frame.pts = None  # browser WebM timestamps can be non-monotonic; the resampler doesn't need them
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks).astype(np.float32, copy=False)
+
+
+class _GrowingBuffer:
+    """Read-only file object over bytes that are still arriving; read() blocks until data or finish()"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.finished = False
+        self.condition = threading.Condition()
+
+    def feed(self, data):
+        with self.condition:
+            self.data.extend(data)
+            self.condition.notify_all()
+
+    def finish(self):
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    def read(self, size=-1):
+        with self.condition:
+            while not self.data and not self.finished:
+                self.condition.wait()
+            size = len(self.data) if size is None or size < 0 else min(size, len(self.data))
+            chunk = bytes(self.data[:size])
+            del self.data[:size]
+            return chunk
+
+
+class StreamDecoder:
+    """
+    Incremental decoder for one growing encoded stream (e.g. MediaRecorder WebM/Opus chunks)
+    A background thread demuxes and decodes bytes as they are fed, so each byte is decoded
+    once instead of re-decoding the whole stream on every update
+    """
+
+    def __init__(self):
+        self.buffer = _GrowingBuffer()
+        self.chunks = []
+        self.decoded_samples = 0
+        self.error = None
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="stream-decoder", daemon=True)
+        self.thread.start()
+
+    def feed(self, data):
+        self.buffer.feed(data)
+
+    def _run(self):
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+        try:
+            # Tiny probe so the demuxer starts on the first chunk instead of waiting for megabytes
+            with av.open(self.buffer, mode="r", options={"probesize": "4096", "analyzeduration": "0"}) as container:
+                stream = container.streams.audio[0]
+                for frame in container.decode(stream):
+                    frame.pts = None
+                    self._append(resampler.resample(frame))
+            self._append(resampler.resample(None))
+        except Exception as e:
+            self.error = e
+            print(f"Error decoding audio stream: {e}")
+
+    def _append(self, frames):
+        for resampled in frames:
+            chunk = resampled.to_ndarray().reshape(-1).astype(np.float32, copy=False)
+            with self.lock:
+                self.chunks.append(chunk)
+                self.decoded_samples += len(chunk)
+
+    def samples(self):
+        """Everything decoded so far"""
+        with self.lock:
+            if not self.chunks:
+                return np.zeros(0, dtype=np.float32)
+            if len(self.chunks) > 1:
+                self.chunks = [np.concatenate(self.chunks)]
+            return self.chunks[0]
+
+    def decoded_seconds(self):
+        """Duration decoded so far"""
+        with self.lock:
+            return self.decoded_samples / SAMPLE_RATE
+
+    def close(self, timeout=None):
+        """No more input: let the decoder drain and wait for it"""
+        self.buffer.finish()
+        self.thread.join(timeout)
+
+
+def _decode_with_pydub(data):
+    sound = AudioSegment.from_file(io.BytesIO(data))
+    sound = sound.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+    samples = np.array(sound.get_array_of_samples(), dtype=np.float32)
+    return samples / 32768.0
+
+
+def encode_wav(samples, sample_rate=SAMPLE_RATE):
+    """Encode a float32 buffer as 16-bit PCM WAV bytes without touching disk"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+# Archival codecs: container, encoder, encoder sample rate and file suffix
+ARCHIVE_CODECS = {
+    "opus": {"container": "ogg", "codec": "libopus", "rate": 48000, "suffix": ".ogg"},
+    "aac": {"container": "mp4", "codec": "aac", "rate": SAMPLE_RATE, "suffix": ".m4a"},
+    "wav": {"container": None, "codec": None, "rate": SAMPLE_RATE, "suffix": ".wav"},
+}
+
+
+def parse_bitrate(bitrate):
+    """'24k' / '24000' -> 24000 bits per second"""
+    text = str(bitrate).strip().lower()
+    return int(float(text[:-1]) * 1000) if text.endswith("k") else int(text)
+
+
+def encode_archival(samples, codec="opus", bitrate="24k", sample_rate=SAMPLE_RATE):
+    """
+    Compress a decoded recording for storage; speech at 24 kbit/s Opus is ~10x smaller than PCM WAV
+    Encodes in process with PyAV. Returns (data, info) where info records codec, bitrate, suffix
+    and size; falls back to WAV for an unknown codec or if the encoder is unavailable
+    """
+    if codec != "wav":
+        try:
+            settings = ARCHIVE_CODECS[codec]
+            if av is None:
+                raise RuntimeError("PyAV is not installed")
+            data = _encode_in_process(samples, settings, parse_bitrate(bitrate), sample_rate)
+            return data, {"codec": codec, "bitrate": bitrate, "suffix": settings["suffix"], "bytes": len(data)}
+        except Exception as e:
+            print(f"Could not encode recording as {codec}, archiving WAV instead: {e!r}")
+    wav = encode_wav(samples, sample_rate)
+    return wav, {"codec": "wav", "bitrate": None, "suffix": ".wav", "bytes": len(wav)}
+
+
+def _encode_in_process(samples, settings, bit_rate, sample_rate):
+    buffer = io.BytesIO()
+    with av.open(buffer, mode="w", format=settings["container"]) as container:
+        stream = container.add_stream(settings["codec"], rate=settings["rate"])
+        stream.layout = "mono"
+        stream.bit_rate = bit_rate
+        codec_context = stream.codec_context
+        codec_context.open()
+        # Resample straight into the encoder's sample format, rate and fixed frame size
+        resampler = av.AudioResampler(format=codec_context.format.name, layout="mono", rate=settings["rate"],
+                                      frame_size=codec_context.frame_size or None)
+        frame = av.AudioFrame.from_ndarray(np.ascontiguousarray(samples, dtype=np.float32)[None, :],
+                                           format="flt", layout="mono")
+        frame.sample_rate = sample_rate
+        for resampled in resampler.resample(frame) + resampler.resample(None):
+            container.mux(stream.encode(resampled))
+        container.mux(stream.encode(None))
+    return buffer.getvalue()
+
+
+def find_runs(mask):
+    """Start/end frame indices (end exclusive) of every run of True in a boolean array"""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_speech(samples, sample_rate=SAMPLE_RATE):
+    """
+    Cheap energy-based voice activity detection, run once per recording
+    Returns speech intervals [(start_seconds, end_seconds), ...]; gaps shorter than
+    MIN_GAP_SECONDS are bridged and blips shorter than MIN_SPEECH_SECONDS dropped
+    """
+    frame = int(VAD_FRAME_SECONDS * sample_rate)
+    count = len(samples) // frame
+    if count == 0:
+        return []
+    rms = np.sqrt(np.mean(np.square(samples[:count * frame].reshape(count, frame)), axis=1))
+    peak = rms.max()
+    if peak < VAD_FLOOR:
+        return []
+    voiced = (rms >= VAD_FLOOR) & (20 * np.log10(np.maximum(rms, 1e-10) / peak) > -SILENCE_DB)
+
+    starts, ends = find_runs(~voiced)
+    inner = (starts > 0) & (ends < count) & ((ends - starts) * VAD_FRAME_SECONDS < MIN_GAP_SECONDS)
+    for start, end in zip(starts[inner], ends[inner]):
+        voiced[start:end] = True
+
+    starts, ends = find_runs(voiced)
+    keep = (ends - starts) * VAD_FRAME_SECONDS >= MIN_SPEECH_SECONDS
+    return [(float(start * VAD_FRAME_SECONDS), float(end * VAD_FRAME_SECONDS))
+            for start, end in zip(starts[keep], ends[keep])]
+
+
+def speaking_duration(speech):
+    """Seconds from the first to the last detected speech (leading/trailing silence excluded)"""
+    return speech[-1][1] - speech[0][0] if speech else 0.0
+
+
+def get_duration(samples, sample_rate=SAMPLE_RATE):
+    """Duration in seconds of a decoded buffer"""
+    return len(samples) / float(sample_rate)
@@ -0,0 +1,214 @@
+"""
+Caching Module
+Bounded in-memory LRU and on-disk SQLite caches with hit/miss counters, plus
+single-flight coalescing of identical in-flight computations
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def content_hash(*parts):
+    """SHA-256 hex digest over bytes/str parts (order sensitive)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache holding at most max_entries values
+    Entries older than ttl seconds (if set) are treated as missing
+    """
+
+    def __init__(self, max_entries=256, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[1] > self.ttl:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, created=None):
+        """created: when the value was first computed (defaults to now); expiry counts from it"""
+        with self.lock:
+            self.entries[key] = (value, time.time() if created is None else created)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "maxEntries": self.max_entries, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class SQLiteCache:
+    """
+    JSON values persisted in a local SQLite file so they survive restarts
+    Entries older than ttl seconds are treated as missing; the least recently
+    accessed entries are evicted once max_entries is exceeded
+    """
+
+    def __init__(self, path, table='cache', max_entries=10000, ttl=None):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key):
+        """(value, created) or None"""
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self.connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.connection.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def put(self, key, value):
+        now = time.time()
+        payload = json.dumps(value)
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            if self.ttl is not None:
+                self.connection.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,))
+            self.connection.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def stats(self):
+        with self.lock:
+            entries = self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            return {"entries": entries, "maxEntries": self.max_entries, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional disk tier; disk hits are promoted to memory
+    The memory tier expires entries with the disk tier's ttl unless it has its own, and a
+    promoted entry keeps its original creation time, so neither tier outlives the ttl
+    """
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+        if disk is not None and memory.ttl is None:
+            memory.ttl = disk.ttl
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            try:
+                entry = self.disk.get_entry(key)
+            except Exception as e:
+                print(f"Error reading from disk cache: {e}")
+                return None
+            if entry is not None:
+                value, created = entry
+                self.memory.put(key, value, created=created)
+        return value
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value)
+            except Exception as e:
+                print(f"Error writing to disk cache: {e}")
+
+    def stats(self):
+        return {"memory": self.memory.stats(), "disk": self.disk.stats() if self.disk is not None else None}
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time
+    Callers that arrive while a key is in flight wait for that computation and share its
+    result (or exception) instead of starting their own
+    """
+
+    def __init__(self):
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Returns (result, shared); shared is True when another caller's computation was reused"""
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def stats(self):
+        with self.lock:
+            return {"inFlight": len(self.in_flight), "leaders": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,71 @@
+"""
+Decoding Policy Module
+Chooses Whisper decoding parameters from current load and clip length
+"""
+
+import os
+
+
+# Most accurate first; each level trades transcript quality for decode time
+# Only knobs faster-whisper's batched pipeline honours: it decodes at a single temperature
+# (no fallback) and ignores best_of, so levels differ in beam width, patience and VAD windows
+POLICY_LEVELS = {
+    "accurate": {
+        "beam_size": 5, "patience": 1.5, "temperature": 0.0,
+        "vad_parameters": {"min_silence_duration_ms": 500, "speech_pad_ms": 400},
+    },
+    "balanced": {
+        "beam_size": 3, "patience": 1.0, "temperature": 0.0,
+        "vad_parameters": {"min_silence_duration_ms": 700, "speech_pad_ms": 300},
+    },
+    "greedy": {
+        # One hypothesis per window, fewer and longer VAD windows
+        "beam_size": 1, "patience": 1.0, "temperature": 0.0,
+        "vad_parameters": {"min_silence_duration_ms": 1000, "speech_pad_ms": 200},
+    },
+}
+
+
+class DecodingPolicy:
+    """
+    accurate  - normal operation
+    balanced  - queue at busy_queue_depth or clip longer than long_clip_seconds
+    greedy    - queue at saturated_queue_depth; we would rather be rough than time out
+    """
+
+    def __init__(self, busy_queue_depth=4, saturated_queue_depth=8, long_clip_seconds=120.0):
+        self.busy_queue_depth = busy_queue_depth
+        self.saturated_queue_depth = saturated_queue_depth
+        self.long_clip_seconds = long_clip_seconds
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            busy_queue_depth=int(os.getenv("DECODING_BUSY_QUEUE_DEPTH", "4")),
+            saturated_queue_depth=int(os.getenv("DECODING_SATURATED_QUEUE_DEPTH", "8")),
+            long_clip_seconds=float(os.getenv("DECODING_LONG_CLIP_SECONDS", "120")),
+        )
+
+    def level(self, queue_depth, duration_seconds=None):
+        if queue_depth >= self.saturated_queue_depth:
+            return "greedy"
+        if queue_depth >= self.busy_queue_depth:
+            return "balanced"
+        if duration_seconds is not None and duration_seconds > self.long_clip_seconds:
+            return "balanced"
+        return "accurate"
+
+    def choose(self, queue_depth, duration_seconds=None):
+        """Returns (level_name, transcribe keyword options)"""
+        name = self.level(queue_depth, duration_seconds)
+        options = POLICY_LEVELS[name]
+        return name, {**options, "vad_parameters": dict(options["vad_parameters"])}
+
+
+def describe_policy(name, options, queue_depth):
+    """Response metadata for the chosen policy"""
+    return {
+        "name": name, "beamSize": options["beam_size"], "patience": options["patience"],
+        "temperature": options["temperature"],
+        "vad": options["vad_parameters"], "queueDepth": queue_depth
+    }
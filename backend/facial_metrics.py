@@ -3,9 +3,12 @@ Facial Metrics Analysis Module
 Analyzes facial expressions, emotions, engagement, and provides real-time metrics
 """
 
+import os
+import threading
+import time
+from collections import OrderedDict
 import cv2
 import numpy as np
-from deepface import DeepFace
 from PIL import Image
 import io
 import base64
@@ -14,13 +17,60 @@ import traceback
 from datetime import datetime
 
 
+_deepface = None
+
+# One detector pass per frame; its region and aligned crop feed every score
+DETECTOR_BACKEND = os.getenv("FACE_DETECTOR_BACKEND", "opencv")
+
+# Frame pacing: ask clients for a rate the analysis can keep up with, leaving some headroom
+MIN_TARGET_FPS = float(os.getenv("FACIAL_MIN_FPS", "1"))
+MAX_TARGET_FPS = float(os.getenv("FACIAL_MAX_FPS", "10"))
+PACING_HEADROOM = 0.8
+
+
+def get_deepface():
+    """Import DeepFace (and TensorFlow) on first use instead of at server startup"""
+    global _deepface
+    if _deepface is None:
+        from deepface import DeepFace
+        _deepface = DeepFace
+    return _deepface
+
+
+def warmup():
+    """Load the face detector and emotion model by analyzing a blank frame"""
+    analyzer = FacialMetricsAnalyzer()
+    face = analyzer._detect_face(np.zeros((224, 224, 3), dtype=np.uint8))
+    if face is not None:
+        analyzer._analyze_emotions(face)
+
+
+class RunningStats:
+    """Welford's online mean/variance: O(1) memory however many values are added"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def variance(self):
+        """Population variance (same as np.var)"""
+        return self.m2 / self.count if self.count else 0.0
+
+
 class FacialMetricsAnalyzer:
     """Analyzes facial metrics from video frames"""
     
     def __init__(self):
-        self.emotion_history = []
-        self.engagement_history = []
-        self.confidence_history = []
+        self.emotion_counts = {}
+        self.engagement_stats = RunningStats()
+        self.confidence_stats = RunningStats()
         self.frame_count = 0
         self.previous_blink_state = False
         self.blink_count = 0
@@ -29,15 +79,32 @@ class FacialMetricsAnalyzer:
         
     def reset_session(self):
         """Reset metrics for a new session"""
-        self.emotion_history = []
-        self.engagement_history = []
-        self.confidence_history = []
+        self.emotion_counts = {}
+        self.engagement_stats = RunningStats()
+        self.confidence_stats = RunningStats()
         self.frame_count = 0
         self.previous_blink_state = False
         self.blink_count = 0
         self.eye_open_frames = 0
         self.total_frames = 0
     
+    def decode_frame(self, frame_data):
+        """
+        Decode a frame to a BGR numpy array
+        Binary JPEG/WebP payloads (bytes) go straight to cv2.imdecode; strings are the
+        base64 data URLs older clients send
+        """
+        if isinstance(frame_data, (bytes, bytearray, memoryview)):
+            try:
+                frame = cv2.imdecode(np.frombuffer(frame_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    print("Error decoding frame: unsupported or corrupt image payload")
+                return frame
+            except Exception as e:
+                print(f"Error decoding frame: {e}")
+                return None
+        return self.decode_base64_frame(frame_data)
+    
     def decode_base64_frame(self, base64_str):
         """Decode base64 encoded frame to numpy array"""
         try:
@@ -45,37 +112,47 @@ class FacialMetricsAnalyzer:
                 base64_str = base64_str.split(',')[1]
             
             img_data = base64.b64decode(base64_str)
-            img = Image.open(io.BytesIO(img_data))
+            frame = cv2.imdecode(np.frombuffer(img_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                return frame
+            # Formats OpenCV can't read still go through PIL
+            img = Image.open(io.BytesIO(img_data)).convert('RGB')
             return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
         except Exception as e:
             print(f"Error decoding frame: {e}")
             return None
     
-    def analyze_frame(self, frame_base64):
+    def analyze_frame(self, frame_data):
         """
         Analyze a single video frame for facial metrics
+        frame_data: binary JPEG/WebP bytes or a base64 data URL
         Returns: {emotion, engagement_score, confidence_score, eye_contact_score, timestamp}
         """
         try:
-            frame = self.decode_base64_frame(frame_base64)
+            frame = self.decode_frame(frame_data)
             if frame is None:
                 return None
             
             self.total_frames += 1
             
-            # Analyze emotions using DeepFace
-            emotions = self._analyze_emotions(frame)
+            # Single face detection shared by every score below
+            face = self._detect_face(frame)
+            if face is None:
+                return None
+            
+            # Analyze emotions on the aligned face crop (no second detection)
+            emotions = self._analyze_emotions(face)
             if not emotions:
                 return None
             
             # Calculate engagement score
-            engagement_score = self._calculate_engagement_score(frame)
+            engagement_score = self._calculate_engagement_score(face, frame)
             
             # Calculate confidence score based on dominant emotion and smile
             confidence_score = self._calculate_confidence_score(emotions)
             
             # Estimate eye contact (simplified - based on face position)
-            eye_contact_score = self._estimate_eye_contact(frame)
+            eye_contact_score = self._estimate_eye_contact(face, frame)
             
             metrics = {
                 "timestamp": datetime.now().isoformat(),
@@ -87,10 +164,11 @@ class FacialMetricsAnalyzer:
                 "blink_detected": False
             }
             
-            # Store in history
-            self.emotion_history.append(metrics["dominant_emotion"])
-            self.engagement_history.append(engagement_score)
-            self.confidence_history.append(confidence_score)
+            # Fold into the running session aggregates
+            dominant = metrics["dominant_emotion"]
+            self.emotion_counts[dominant] = self.emotion_counts.get(dominant, 0) + 1
+            self.engagement_stats.add(engagement_score)
+            self.confidence_stats.add(confidence_score)
             
             return metrics
             
@@ -99,14 +177,38 @@ class FacialMetricsAnalyzer:
             traceback.print_exc()
             return None
     
-    def _analyze_emotions(self, frame):
+    def _detect_face(self, frame):
+        """
+        Detect and align the most prominent face once per frame
+        Returns: {crop (BGR uint8), region {x, y, w, h}, confidence, detected} or None
         """
-        Analyze emotions in the frame using DeepFace
+        try:
+            faces = get_deepface().extract_faces(frame, detector_backend=DETECTOR_BACKEND,
+                                                 enforce_detection=False, align=True)
+            if not faces:
+                return None
+            face = max(faces, key=lambda f: f['facial_area']['w'] * f['facial_area']['h'])
+            h, w = frame.shape[:2]
+            region = face['facial_area']
+            # With enforce_detection=False a miss comes back as the whole frame with zero confidence
+            detected = face.get('confidence', 0) > 0 and (region['w'], region['h']) != (w, h)
+            # extract_faces returns RGB floats in [0, 1]; the emotion model expects BGR uint8
+            crop = (np.clip(face['face'], 0, 1)[:, :, ::-1] * 255).astype(np.uint8)
+            return {"crop": crop, "region": region, "confidence": float(face.get('confidence', 0)),
+                    "detected": detected}
+        except Exception as e:
+            print(f"Error in face detection: {e}")
+            return None
+    
+    def _analyze_emotions(self, face):
+        """
+        Analyze emotions in the detected face using DeepFace
         Returns: {emotion: score, ...}
         """
         try:
-            # Use DeepFace for emotion analysis
-            result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
+            # Emotion model only, on the already aligned crop
+            result = get_deepface().analyze(face['crop'], actions=['emotion'], detector_backend='skip',
+                                            enforce_detection=False)
             
             if isinstance(result, list) and len(result) > 0:
                 emotions = result[0]['emotion']
@@ -121,20 +223,18 @@ class FacialMetricsAnalyzer:
             print(f"Error in emotion analysis: {e}")
             return None
     
-    def _calculate_engagement_score(self, frame):
+    def _calculate_engagement_score(self, face, frame):
         """
         Calculate engagement score (0-100) based on facial features
-        Factors: face detection confidence, head position stability
+        Factors: face detection confidence, face size in frame
         """
         try:
-            # Try to detect face - higher confidence = more engagement
-            result = DeepFace.analyze(frame, actions=['age', 'gender'], enforce_detection=False)
-            
-            if result and len(result) > 0:
-                # Base engagement on face presence and size
+            if face['detected']:
+                # Higher detection confidence and a closer face = more engagement
                 h, w = frame.shape[:2]
-                # Assume more face area = more engagement
-                engagement = 65 + np.random.randint(-10, 20)  # Base 65-85
+                region = face['region']
+                face_share = min(1.0, (region['w'] * region['h']) / float(w * h) / 0.15)
+                engagement = 50 + 20 * min(1.0, face['confidence']) + 30 * face_share
             else:
                 engagement = 30  # Low engagement if face not detected
             
@@ -170,17 +270,15 @@ class FacialMetricsAnalyzer:
         
         return min(100, max(0, score))
     
-    def _estimate_eye_contact(self, frame):
+    def _estimate_eye_contact(self, face, frame):
         """
         Estimate eye contact score (0-100)
         Simplified version - based on face position and center
         """
         try:
-            result = DeepFace.analyze(frame, actions=['age'], enforce_detection=False)
-            
-            if result and len(result) > 0:
+            if face['detected']:
                 # Assume face centered = good eye contact
-                face_region = result[0]['region']
+                face_region = face['region']
                 h, w = frame.shape[:2]
                 
                 # Calculate how centered the face is
@@ -202,19 +300,15 @@ class FacialMetricsAnalyzer:
         """
         Get summary statistics for the entire session
         """
-        if not self.emotion_history:
+        if not self.emotion_counts:
             return None
         
-        # Calculate averages
-        avg_engagement = np.mean(self.engagement_history) if self.engagement_history else 0
-        avg_confidence = np.mean(self.confidence_history) if self.confidence_history else 0
-        
-        # Calculate emotion breakdown
-        emotion_counts = {}
-        for emotion in self.emotion_history:
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+        # Averages and emotion breakdown come straight from the running aggregates
+        avg_engagement = self.engagement_stats.mean
+        avg_confidence = self.confidence_stats.mean
+        emotion_counts = self.emotion_counts
         
-        total = len(self.emotion_history)
+        total = sum(emotion_counts.values())
         emotion_breakdown = {k: round((v/total)*100, 2) for k, v in emotion_counts.items()}
         
         return {
@@ -231,11 +325,11 @@ class FacialMetricsAnalyzer:
         Calculate how consistent the user's emotions/engagement were
         Lower variance = higher consistency
         """
-        if len(self.engagement_history) < 2:
+        if self.engagement_stats.count < 2:
             return 100
         
-        engagement_variance = np.var(self.engagement_history)
-        confidence_variance = np.var(self.confidence_history)
+        engagement_variance = self.engagement_stats.variance()
+        confidence_variance = self.confidence_stats.variance()
         
         # Lower variance = higher consistency score
         avg_variance = (engagement_variance + confidence_variance) / 2
@@ -244,6 +338,133 @@ class FacialMetricsAnalyzer:
         return round(min(100, max(0, consistency)), 2)
 
 
+class FacialSession:
+    """
+    One live analysis session; lock serializes frames so the analyzer state stays consistent
+    Incoming frames go through a one-slot mailbox: a newer frame replaces one still waiting,
+    so the metrics a client sees are never more than one analysis behind
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.analyzer = FacialMetricsAnalyzer()
+        self.lock = threading.Lock()
+        self.created = time.monotonic()
+        self.last_seen = self.created
+        self.mailbox_lock = threading.Lock()
+        self.pending = None
+        self.draining = False
+        self.received = 0
+        self.dropped = 0
+        self.analysis_seconds = None
+
+    def offer(self, frame_data):
+        """Put a frame in the mailbox; returns True if the caller should start draining it"""
+        with self.mailbox_lock:
+            self.received += 1
+            if self.pending is not None:
+                self.dropped += 1  # stale: a newer frame arrived before it was analyzed
+            self.pending = frame_data
+            if self.draining:
+                return False
+            self.draining = True
+            return True
+
+    def take(self):
+        """Newest waiting frame, or None (and the drainer stops) once the mailbox is empty"""
+        with self.mailbox_lock:
+            frame_data, self.pending = self.pending, None
+            if frame_data is None:
+                self.draining = False
+            return frame_data
+
+    def record_analysis(self, seconds):
+        """Exponentially weighted analysis time per frame"""
+        with self.mailbox_lock:
+            if self.analysis_seconds is None:
+                self.analysis_seconds = seconds
+            else:
+                self.analysis_seconds += 0.2 * (seconds - self.analysis_seconds)
+
+    def pacing(self):
+        with self.mailbox_lock:
+            if self.analysis_seconds:
+                target = PACING_HEADROOM / self.analysis_seconds
+            else:
+                target = MAX_TARGET_FPS
+            return {
+                "targetFps": round(min(MAX_TARGET_FPS, max(MIN_TARGET_FPS, target)), 1),
+                "analysisMs": round((self.analysis_seconds or 0) * 1000),
+                "framesReceived": self.received, "framesDropped": self.dropped
+            }
+
+
+class FacialSessionRegistry:
+    """
+    Keeps one FacialMetricsAnalyzer per live session, keyed by (socket sid, sessionId)
+    Sessions idle for longer than idle_ttl seconds are evicted, and beyond max_sessions the
+    least recently used session is dropped, so memory stays bounded with many clients
+    """
+
+    def __init__(self, max_sessions=200, idle_ttl=300.0):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.evicted = 0
+
+    def _evict_idle(self, now):
+        # Oldest-touched first, so stop at the first session that is still fresh
+        while self.sessions:
+            key, session = next(iter(self.sessions.items()))
+            if now - session.last_seen <= self.idle_ttl:
+                break
+            del self.sessions[key]
+            self.evicted += 1
+            print(f"Evicted idle facial analysis session {key}")
+
+    def start(self, sid, session_id):
+        """Create (or restart) a session with a fresh analyzer"""
+        key = (sid, session_id)
+        now = time.monotonic()
+        with self.lock:
+            self._evict_idle(now)
+            session = self.sessions[key] = FacialSession(key)
+            self.sessions.move_to_end(key)
+            while len(self.sessions) > self.max_sessions:
+                dropped, _ = self.sessions.popitem(last=False)
+                self.evicted += 1
+                print(f"Evicted facial analysis session {dropped} (over {self.max_sessions} sessions)")
+            return session
+
+    def get(self, sid, session_id, create=True):
+        """The live session, touched; sessions that frames arrive for without a start are created"""
+        key = (sid, session_id)
+        now = time.monotonic()
+        with self.lock:
+            self._evict_idle(now)
+            session = self.sessions.get(key)
+            if session is not None:
+                session.last_seen = now
+                self.sessions.move_to_end(key)
+                return session
+        return self.start(sid, session_id) if create else None
+
+    def end(self, sid, session_id):
+        with self.lock:
+            return self.sessions.pop((sid, session_id), None)
+
+    def drop_connection(self, sid):
+        """Forget every session of a disconnected client"""
+        with self.lock:
+            for key in [key for key in self.sessions if key[0] == sid]:
+                del self.sessions[key]
+
+    def stats(self):
+        with self.lock:
+            return {"sessions": len(self.sessions), "maxSessions": self.max_sessions, "evicted": self.evicted}
+
+
 # Global analyzer instance
 facial_analyzer = FacialMetricsAnalyzer()
 
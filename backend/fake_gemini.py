@@ -0,0 +1,52 @@
+"""
+Fake Gemini Module
+Offline stand-in for genai.GenerativeModel with configurable latency and failures
+"""
+
+import json
+import random
+import time
+from types import SimpleNamespace
+
+
+class FakeGeminiModel:
+    """
+    Returns canned feedback JSON shaped like a real generate_content response
+    latency: seconds to sleep per call; failure_rate: probability of raising error_type
+    """
+
+    def __init__(self, latency=0.2, failure_rate=0.0, error_type=TimeoutError):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.error_type = error_type
+        self.calls = 0
+
+    def generate_content(self, prompt, request_options=None):
+        self.calls += 1
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake Gemini call exceeded {timeout}s")
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise self.error_type("Fake Gemini transient failure")
+
+        feedback = {
+            "overallFeedback": "Offline feedback from the fake Gemini model.",
+            "confidenceScore": 70,
+            "pacingAnalysis": {"assessment": "Steady pace.", "recommendation": "Keep it up."},
+            "vocalVarietyAnalysis": {"assessment": "Some variety.", "recommendation": "Stress key words."},
+            "grammaticalErrors": [], "clarityConciseness": [],
+            "keyImprovements": [{"area": "Practice", "action": "Record another take."}]
+        }
+        if '"fillerWordAnalysis"' in prompt:
+            feedback["fillerWordAnalysis"] = []
+            feedback["pauseAnalysis"] = []
+        if '"facialAnalysis"' in prompt:
+            feedback["facialAnalysis"] = {"assessment": "Engaged.", "recommendation": "Look at the camera."}
+
+        return SimpleNamespace(
+            text=f"```json\n{json.dumps(feedback)}\n```",
+            candidates=[SimpleNamespace(finish_reason=1)],
+            prompt_feedback=None
+        )
@@ -0,0 +1,153 @@
+"""
+Gemini Client Module
+Deadlines, bounded concurrency, jittered retries and a circuit breaker around generate_content
+"""
+
+import random
+import threading
+import time
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    TRANSIENT_ERRORS = (
+        google_exceptions.DeadlineExceeded, google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError, google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests, google_exceptions.GatewayTimeout,
+        TimeoutError, ConnectionError
+    )
+except ImportError:
+    TRANSIENT_ERRORS = (TimeoutError, ConnectionError)
+
+
+class GeminiUnavailable(Exception):
+    """Raised without calling upstream when the circuit is open or no slot is free in time"""
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures
+    While open every call is rejected; after reset_timeout one probe call is let through
+    (half-open) and its outcome closes or re-opens the circuit
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self.lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probe_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+
+    def release_probe(self):
+        """Give back a half-open probe that ended without a transient success/failure verdict"""
+        with self.lock:
+            self.probe_in_flight = False
+
+
+class ResilientGeminiClient:
+    """
+    Drop-in wrapper exposing generate_content(prompt) like genai.GenerativeModel
+    - at most max_concurrency calls in flight; callers wait up to acquire_timeout for a slot
+    - every attempt gets request_timeout seconds, all attempts together at most deadline seconds
+    - transient errors are retried with full-jitter exponential backoff
+    - consecutive transient failures open the circuit breaker so callers fail fast
+    """
+
+    def __init__(self, model, request_timeout=20.0, deadline=45.0, max_concurrency=4, acquire_timeout=5.0,
+                 max_retries=2, backoff_base=0.5, backoff_max=4.0, breaker=None):
+        self.model = model
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.acquire_timeout = acquire_timeout
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.stats_lock = threading.Lock()
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    def _count(self, name):
+        with self.stats_lock:
+            self.counters[name] += 1
+
+    def generate_content(self, prompt):
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise GeminiUnavailable("Gemini circuit breaker is open")
+        if not self.slots.acquire(timeout=self.acquire_timeout):
+            self.breaker.release_probe()
+            self._count("rejected")
+            raise GeminiUnavailable("Too many concurrent Gemini requests")
+        try:
+            return self._call_with_retries(prompt)
+        finally:
+            self.slots.release()
+
+    def _call_with_retries(self, prompt):
+        self._count("calls")
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = give_up_at - time.monotonic()
+            try:
+                response = self.model.generate_content(
+                    prompt, request_options={"timeout": max(1.0, min(self.request_timeout, remaining))}
+                )
+            except TRANSIENT_ERRORS as e:
+                backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if attempt >= self.max_retries or time.monotonic() + backoff >= give_up_at:
+                    self._count("failures")
+                    self.breaker.record_failure()
+                    raise
+                print(f"Transient Gemini error ({type(e).__name__}), retrying in {backoff:.2f}s")
+                self._count("retries")
+                attempt += 1
+                time.sleep(backoff)
+                continue
+            except Exception:
+                # Request-level errors (bad prompt, auth) say nothing about upstream health
+                self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return response
+
+    def stats(self):
+        with self.stats_lock:
+            return {**self.counters, "circuit": self.breaker.state, "maxConcurrency": self.max_concurrency}
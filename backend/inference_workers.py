@@ -0,0 +1,227 @@
+"""
+Inference Workers Module
+Runs Whisper and prosody analysis in separate worker processes fed through a local IPC queue
+"""
+
+import itertools
+import multiprocessing
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from transcription import segments_from_dicts
+from whisper_registry import WhisperRegistry, WhisperTier
+
+
+class WorkerCrashed(Exception):
+    """The worker process running a task exited before returning a result"""
+
+
+def run_task(tiers, kind, args):
+    """Execute one queued task inside a worker; tiers maps Whisper model name -> WhisperTier"""
+    from prosody import analyze_prosody
+    from transcription import segments_to_dicts
+
+    if kind == "transcribe":
+        tier_name, samples, options = args
+        return segments_to_dicts(tiers[tier_name].scheduler.transcribe(samples, **options))
+    if kind == "prosody":
+        samples, speech = args
+        return analyze_prosody(samples, speech=speech)
+    raise ValueError(f"Unknown inference task '{kind}'")
+
+
+def _worker_main(worker_id, tasks, results, whisper_config, threads):
+    """Entry point of a worker process: load models, warm up, then serve tasks until killed"""
+    import numpy as np
+    from prosody import analyze_prosody
+
+    try:
+        registry = WhisperRegistry.load(whisper_config)
+        for tier in registry.tiers:
+            segments, info = tier.scheduler.model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1,
+                                                             language="en")
+            list(segments)
+        analyze_prosody(np.random.default_rng(0).standard_normal(16000).astype(np.float32) * 0.1)
+    except Exception:
+        results.put(("failed", worker_id, traceback.format_exc()))
+        return
+    tiers = {tier.name: tier for tier in registry.tiers}
+    results.put(("ready", worker_id, {name: tier.device for name, tier in tiers.items()}))
+
+    def run(task_id, kind, args):
+        try:
+            results.put(("result", task_id, run_task(tiers, kind, args)))
+        except Exception as e:
+            results.put(("error", task_id, f"{type(e).__name__}: {e}"))
+
+    # Several threads per worker so concurrent transcriptions can still be micro-batched
+    executor = ThreadPoolExecutor(max_workers=threads)
+    while True:
+        task_id, kind, args = tasks.get()
+        results.put(("started", task_id, worker_id))
+        executor.submit(run, task_id, kind, args)
+
+
+class InferencePool:
+    """
+    N worker processes, each holding its own copy of the models
+    The web process only enqueues tasks and resolves futures; a supervisor thread
+    replaces crashed workers and fails the tasks they had in flight
+    """
+
+    def __init__(self, num_workers, whisper_config, threads_per_worker=4, task_timeout=600.0):
+        self.context = multiprocessing.get_context("spawn")
+        self.num_workers = num_workers
+        self.whisper_config = whisper_config
+        self.threads_per_worker = threads_per_worker
+        self.task_timeout = task_timeout
+        self.tasks = self.context.Queue()
+        self.results = self.context.Queue()
+        self.task_ids = itertools.count()
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.assigned = {}
+        self.processes = {}
+        self.devices = {}
+        self.ready_event = threading.Event()
+        self.restarts = 0
+        self.failures = []
+
+        for worker_id in range(num_workers):
+            self._spawn(worker_id)
+        threading.Thread(target=self._collect_results, name="inference-results", daemon=True).start()
+        threading.Thread(target=self._supervise, name="inference-supervisor", daemon=True).start()
+
+    def _spawn(self, worker_id):
+        process = self.context.Process(
+            target=_worker_main, name=f"inference-worker-{worker_id}",
+            args=(worker_id, self.tasks, self.results, self.whisper_config, self.threads_per_worker),
+            daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+        print(f"Started inference worker {worker_id} (pid {process.pid}).")
+
+    def wait_ready(self, timeout=None):
+        """Block until at least one worker has loaded its models; raises if all of them failed"""
+        while not self.ready_event.wait(timeout=1.0 if timeout is None else min(1.0, timeout)):
+            if len(self.failures) >= self.num_workers:
+                raise RuntimeError(f"All inference workers failed to load models:\n{self.failures[-1]}")
+            if timeout is not None:
+                timeout -= 1.0
+                if timeout <= 0:
+                    raise TimeoutError("Inference workers did not become ready in time")
+
+    def _enqueue(self, kind, args):
+        task_id = next(self.task_ids)
+        future = Future()
+        with self.lock:
+            self.futures[task_id] = future
+        self.tasks.put((task_id, kind, args))
+        return task_id, future
+
+    def submit(self, kind, *args):
+        return self._enqueue(kind, args)[1]
+
+    def call(self, kind, *args):
+        task_id, future = self._enqueue(kind, args)
+        try:
+            return future.result(timeout=self.task_timeout)
+        except FutureTimeout:
+            # A lost task would otherwise count towards pending() (and so routing load) forever
+            with self.lock:
+                self.futures.pop(task_id, None)
+                self.assigned.pop(task_id, None)
+            raise
+
+    def pending(self):
+        with self.lock:
+            return len(self.futures)
+
+    def _collect_results(self):
+        while True:
+            message = self.results.get()
+            kind = message[0]
+            if kind == "ready":
+                _, worker_id, devices = message
+                self.devices = devices
+                self.ready_event.set()
+                print(f"Inference worker {worker_id} ready: {devices}")
+            elif kind == "failed":
+                _, worker_id, error = message
+                self.failures.append(error)
+                print(f"CRITICAL ERROR: Inference worker {worker_id} could not load models.\n{error}")
+            elif kind == "started":
+                _, task_id, worker_id = message
+                with self.lock:
+                    if task_id in self.futures:
+                        self.assigned[task_id] = worker_id
+            else:
+                _, task_id, value = message
+                with self.lock:
+                    future = self.futures.pop(task_id, None)
+                    self.assigned.pop(task_id, None)
+                if future is None:
+                    continue
+                if kind == "result":
+                    future.set_result(value)
+                else:
+                    future.set_exception(RuntimeError(value))
+
+    def _supervise(self):
+        while True:
+            time.sleep(1.0)
+            for worker_id, process in list(self.processes.items()):
+                if process.is_alive() or process.exitcode is None:
+                    continue
+                # A worker that exits after a failed model load reports "failed"; don't respawn it forever
+                if process.exitcode == 0:
+                    continue
+                print(f"CRITICAL ERROR: Inference worker {worker_id} died (exit code {process.exitcode}), restarting.")
+                with self.lock:
+                    lost = [task_id for task_id, owner in self.assigned.items() if owner == worker_id]
+                    for task_id in lost:
+                        self.assigned.pop(task_id, None)
+                        future = self.futures.pop(task_id, None)
+                        if future is not None:
+                            future.set_exception(WorkerCrashed(f"Inference worker {worker_id} crashed"))
+                self.restarts += 1
+                self._spawn(worker_id)
+
+    def status(self):
+        with self.lock:
+            in_flight = len(self.futures)
+        return {
+            "workers": {worker_id: {"pid": process.pid, "alive": process.is_alive()}
+                        for worker_id, process in self.processes.items()},
+            "inFlight": in_flight, "restarts": self.restarts
+        }
+
+
+class RemoteScheduler:
+    """Stands in for a TranscriptionScheduler; forwards transcription of one tier to the pool"""
+
+    def __init__(self, pool, tier_name):
+        self.pool = pool
+        self.tier_name = tier_name
+        self.stats = {}
+
+    def transcribe(self, samples, **options):
+        return segments_from_dicts(self.pool.call("transcribe", self.tier_name, samples, options))
+
+    def queue_depth(self):
+        # Pool-wide backlog; every tier shares the same workers
+        return self.pool.pending()
+
+
+def remote_registry(pool, whisper_config):
+    """A WhisperRegistry whose tiers run inside the worker pool, so routing stays in the web process"""
+    tiers = [WhisperTier(name, RemoteScheduler(pool, name), pool.devices.get(name, "cpu"))
+             for name in whisper_config["models"]]
+    # Tiers share one pool, so the backlog is the pool's, not a per-tier sum
+    return WhisperRegistry(tiers, long_clip_seconds=whisper_config["long_clip_seconds"],
+                           busy_queue_depth=whisper_config["busy_queue_depth"],
+                           cpu_max_model=whisper_config["cpu_max_model"], queue_depth_fn=pool.pending)
@@ -0,0 +1,121 @@
+"""
+Analysis Jobs Module
+Bounded background queue that runs speech analyses and tracks per-stage progress
+"""
+
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+
+class JobQueueFull(Exception):
+    """Raised when the pending job queue is at capacity"""
+
+
+class JobQueue:
+    """
+    Accepts analysis jobs at request speed and runs them on a fixed number of workers
+    handler(payload, report_stage) does the work and returns the JSON-serialisable result;
+    on_update(snapshot) is called on every state change so results can be pushed to clients
+    """
+
+    def __init__(self, handler, num_workers=2, max_pending=32, result_ttl=600, on_update=None):
+        self.handler = handler
+        self.on_update = on_update
+        self.result_ttl = result_ttl
+        self.num_workers = num_workers
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.workers = []
+
+    def start(self):
+        """Start the worker threads; jobs submitted before this wait in the queue"""
+        for index in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"analysis-job-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, payload):
+        """Queue a job and return its id; raises JobQueueFull when saturated"""
+        self._evict_expired()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {
+            "jobId": job_id, "status": "queued", "stages": {},
+            "result": None, "error": None, "createdAt": now, "updatedAt": now
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+        try:
+            self.pending.put_nowait((job_id, payload))
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job_id]
+            raise JobQueueFull("Analysis queue is full, try again shortly")
+        self._notify(job_id)
+        return job_id
+
+    def get(self, job_id):
+        """Return a snapshot of the job state, or None if unknown/expired"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def queue_depth(self):
+        """Number of jobs waiting for a worker"""
+        return self.pending.qsize()
+
+    def _snapshot(self, job):
+        return {**job, "stages": dict(job["stages"])}
+
+    def _update(self, job_id, **changes):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job.update(changes)
+            job["updatedAt"] = time.time()
+        self._notify(job_id)
+
+    def _notify(self, job_id):
+        if not self.on_update:
+            return
+        snapshot = self.get(job_id)
+        if snapshot is None:
+            return
+        try:
+            self.on_update(snapshot)
+        except Exception as e:
+            print(f"Error pushing job update for {job_id}: {e}")
+
+    def _worker_loop(self):
+        while True:
+            job_id, payload = self.pending.get()
+            try:
+                self._update(job_id, status="running")
+
+                def report_stage(name, seconds):
+                    with self.lock:
+                        job = self.jobs.get(job_id)
+                        if job is not None:
+                            job["stages"][name] = seconds
+                    self._update(job_id)
+
+                result = self.handler(payload, report_stage)
+                self._update(job_id, status="completed", result=result)
+            except Exception as e:
+                print(f"Analysis job {job_id} failed: {traceback.format_exc()}")
+                self._update(job_id, status="failed", error=str(e))
+            finally:
+                self.pending.task_done()
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.result_ttl
+        with self.lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job["status"] in ("completed", "failed") and job["updatedAt"] < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
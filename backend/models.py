@@ -0,0 +1,97 @@
+"""
+Model Loading Module
+Loads heavy models in the background, warms them up and reports per-model readiness
+"""
+
+import threading
+import time
+import traceback
+
+
+PENDING = "pending"
+LOADING = "loading"
+WARMING_UP = "warming_up"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelLoader:
+    """
+    Registry of lazily loaded models
+    load_fn() returns the model object; warmup_fn(model) runs one throwaway inference so the
+    first real request does not pay for graph building, JIT compilation or weight paging
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, load_fn, warmup_fn=None):
+        with self.lock:
+            self.entries[name] = {
+                "load_fn": load_fn, "warmup_fn": warmup_fn, "model": None,
+                "state": PENDING, "error": None, "loadSeconds": None, "warmupSeconds": None,
+                "event": threading.Event()
+            }
+
+    def start(self):
+        """Load every pending model, each on its own daemon thread"""
+        with self.lock:
+            names = [name for name, entry in self.entries.items() if entry["state"] == PENDING]
+        for name in names:
+            threading.Thread(target=self._load, args=(name,), name=f"load-{name}", daemon=True).start()
+
+    def _set(self, name, **changes):
+        with self.lock:
+            self.entries[name].update(changes)
+
+    def _load(self, name):
+        entry = self.entries[name]
+        try:
+            self._set(name, state=LOADING)
+            started = time.perf_counter()
+            model = entry["load_fn"]()
+            self._set(name, loadSeconds=round(time.perf_counter() - started, 2))
+
+            if entry["warmup_fn"]:
+                self._set(name, state=WARMING_UP)
+                started = time.perf_counter()
+                entry["warmup_fn"](model)
+                self._set(name, warmupSeconds=round(time.perf_counter() - started, 2))
+
+            self._set(name, model=model, state=READY)
+            print(f"Model '{name}' ready (load {entry['loadSeconds']}s, warmup {entry['warmupSeconds']}s).")
+        except Exception as e:
+            print(f"CRITICAL ERROR: Could not load model '{name}'. {traceback.format_exc()}")
+            self._set(name, state=FAILED, error=str(e))
+        finally:
+            entry["event"].set()
+
+    def get(self, name):
+        """The loaded model, or None while it is still loading or if it failed"""
+        with self.lock:
+            entry = self.entries.get(name)
+            return entry["model"] if entry and entry["state"] == READY else None
+
+    def state(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+            return entry["state"] if entry else None
+
+    def wait(self, name, timeout=None):
+        """Block until a model finished loading (successfully or not); returns the model or None"""
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        entry["event"].wait(timeout)
+        return self.get(name)
+
+    def is_ready(self, names=None):
+        with self.lock:
+            names = self.entries.keys() if names is None else names
+            return all(name in self.entries and self.entries[name]["state"] == READY for name in names)
+
+    def status(self):
+        with self.lock:
+            return {name: {key: entry[key] for key in ("state", "error", "loadSeconds", "warmupSeconds")}
+                    for name, entry in self.entries.items()}
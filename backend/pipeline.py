@@ -0,0 +1,77 @@
+"""
+Analysis Pipeline Module
+Runs analysis stages as a small dependency graph on a shared thread pool
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class Stage:
+    """A named unit of work and the stages whose results it consumes"""
+
+    def __init__(self, name, func, depends_on=()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+class Pipeline:
+    """
+    Dependency graph of stages executed on an executor
+    Each stage starts as soon as all of its dependencies have finished and receives
+    their results as keyword arguments named after the dependency stages
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.stages = {}
+        self.timings = {}
+
+    def add_stage(self, name, func, depends_on=()):
+        """Register a stage; dependencies must already be registered"""
+        if name in self.stages:
+            raise ValueError(f"Duplicate pipeline stage '{name}'")
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self.stages[name] = Stage(name, func, depends_on)
+        return self
+
+    def _run_stage(self, stage, kwargs):
+        started = time.perf_counter()
+        try:
+            return stage.func(**kwargs)
+        finally:
+            self.timings[stage.name] = round(time.perf_counter() - started, 3)
+
+    def run(self, on_stage_complete=None):
+        """
+        Execute every stage and return {stage_name: result}
+        on_stage_complete(name, seconds) is called from the calling thread as each stage finishes
+        The first stage failure is re-raised; stages that have not started yet are skipped
+        """
+        results = {}
+        pending = dict(self.stages)
+        running = {}
+
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(dep in results for dep in stage.depends_on):
+                    kwargs = {dep: results[dep] for dep in stage.depends_on}
+                    running[self.executor.submit(self._run_stage, stage, kwargs)] = name
+                    del pending[name]
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    for other in running:
+                        other.cancel()
+                    raise error
+                results[name] = future.result()
+                if on_stage_complete:
+                    on_stage_complete(name, self.timings.get(name))
+
+        return results
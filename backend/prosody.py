@@ -0,0 +1,102 @@
+"""
+Prosody Analysis Module
+Pitch contour, energy, speaking ratio and pauses from a single STFT pass
+"""
+
+import numpy as np
+
+from audio_utils import SAMPLE_RATE, SILENCE_DB, find_runs
+
+
+N_FFT = 1024
+HOP_LENGTH = 256
+PITCH_FMIN = 75.0
+PITCH_FMAX = 400.0
+MIN_PAUSE_SECONDS = 0.3
+
+
+def empty_prosody():
+    """Prosody result for silent, too-short or undecodable audio"""
+    return {
+        "pitch_modulation": 0.0, "mean_pitch": 0.0,
+        "energy_mean": 0.0, "energy_variation": 0.0,
+        "speaking_ratio": 0.0, "pause_count": 0,
+        "longest_pause": 0.0, "average_pause": 0.0, "pauses": []
+    }
+
+
+def speech_mask(speech, offset, frame_count, frame_seconds):
+    """Per-frame voiced mask from detect_speech intervals, for frames starting at offset seconds"""
+    times = offset + np.arange(frame_count) * frame_seconds
+    starts = np.array([start for start, _ in speech])
+    ends = np.array([end for _, end in speech])
+    index = np.searchsorted(starts, times, side='right') - 1
+    return (index >= 0) & (times < ends[np.maximum(index, 0)])
+
+
+def analyze_prosody(y, sr=SAMPLE_RATE, speech=None):
+    """
+    Analyze prosody of a decoded audio buffer
+    One STFT feeds both the pitch tracker and the energy envelope; all per-frame
+    filtering is done with numpy masks
+    speech: detect_speech intervals; when given, leading/trailing silence is trimmed before the
+    STFT and the intervals are used as the voiced mask
+    """
+    try:
+        import librosa  # deferred: importing librosa/numba is slow and only needed per request
+
+        offset = 0.0
+        if speech is not None:
+            if not speech:
+                return empty_prosody()
+            offset = speech[0][0]
+            y = y[int(offset * sr):int(speech[-1][1] * sr)]
+        if len(y) < N_FFT:
+            return empty_prosody()
+
+        S = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+        frame_seconds = HOP_LENGTH / float(sr)
+
+        # Energy envelope and voiced/silent frames
+        rms = librosa.feature.rms(S=S, frame_length=N_FFT)[0]
+        if speech is None:
+            voiced = librosa.amplitude_to_db(rms, ref=np.max) > -SILENCE_DB
+        else:
+            voiced = speech_mask(speech, offset, len(rms), frame_seconds)
+
+        # One pitch per frame: the strongest bin of piptrack's peak picking
+        pitches, magnitudes = librosa.piptrack(S=S, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH,
+                                               fmin=PITCH_FMIN, fmax=PITCH_FMAX)
+        strongest = magnitudes.argmax(axis=0)
+        contour = pitches[strongest, np.arange(pitches.shape[1])]
+        pitched = contour[voiced & (contour > 0)]
+
+        # Pauses are silent runs bounded by speech on both sides
+        starts, ends = find_runs(~voiced)
+        inner = (starts > 0) & (ends < len(voiced))
+        durations = (ends - starts)[inner] * frame_seconds
+        long_enough = durations >= MIN_PAUSE_SECONDS
+        pause_starts = offset + starts[inner][long_enough] * frame_seconds
+        durations = durations[long_enough]
+
+        voiced_rms = rms[voiced]
+        return {
+            "pitch_modulation": float(np.std(pitched)) if len(pitched) > 1 else 0.0,
+            "mean_pitch": float(np.mean(pitched)) if len(pitched) else 0.0,
+            "energy_mean": float(np.mean(voiced_rms)) if len(voiced_rms) else 0.0,
+            "energy_variation": float(np.std(voiced_rms) / np.mean(voiced_rms)) if len(voiced_rms) > 1 else 0.0,
+            "speaking_ratio": float(np.mean(voiced)),
+            "pause_count": int(len(durations)),
+            "longest_pause": float(durations.max()) if len(durations) else 0.0,
+            "average_pause": float(durations.mean()) if len(durations) else 0.0,
+            "pauses": [{"start": round(float(start), 2), "duration": round(float(duration), 2)}
+                       for start, duration in zip(pause_starts, durations)]
+        }
+    except Exception as e:
+        print(f"Could not analyze prosody: {e}")
+        return empty_prosody()
+
+
+def round_prosody(prosody):
+    """Prosody summary rounded for API responses"""
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in prosody.items()}
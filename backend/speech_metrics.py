@@ -0,0 +1,101 @@
+"""
+Speech Delivery Metrics Module
+Filler words, long pauses and per-segment pace computed locally from Whisper word timestamps
+"""
+
+import re
+from collections import Counter
+
+
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "uhm", "er", "erm", "ah", "hmm", "like", "basically", "actually", "literally"}
+FILLER_PHRASES = {("you", "know"), ("i", "mean"), ("kind", "of"), ("sort", "of")}
+LONG_PAUSE_SECONDS = 0.7
+VERY_LONG_PAUSE_SECONDS = 2.0
+CONTEXT_WORDS = 4
+
+
+def _normalize(word):
+    return re.sub(r"[^a-z']", "", word.lower())
+
+
+def collect_words(segments):
+    """Flatten segment word timestamps into [(normalized, raw, start, end), ...]"""
+    words = []
+    for segment in segments:
+        for word in getattr(segment, 'words', None) or []:
+            raw = word.word.strip()
+            normalized = _normalize(raw)
+            if normalized:
+                words.append((normalized, raw, float(word.start), float(word.end)))
+    return words
+
+
+def find_fillers(words):
+    """Count filler words and two-word filler phrases"""
+    counts = Counter()
+    index = 0
+    while index < len(words):
+        if index + 1 < len(words) and (words[index][0], words[index + 1][0]) in FILLER_PHRASES:
+            counts[f"{words[index][0]} {words[index + 1][0]}"] += 1
+            index += 2
+            continue
+        if words[index][0] in FILLER_WORDS:
+            counts[words[index][0]] += 1
+        index += 1
+    return [{"word": word, "count": count} for word, count in counts.most_common()]
+
+
+def find_pauses(words):
+    """Silent gaps between consecutive words longer than LONG_PAUSE_SECONDS"""
+    pauses = []
+    for index in range(1, len(words)):
+        gap = words[index][2] - words[index - 1][3]
+        if gap < LONG_PAUSE_SECONDS:
+            continue
+        before = " ".join(word[1] for word in words[max(0, index - CONTEXT_WORDS):index])
+        after = " ".join(word[1] for word in words[index:index + CONTEXT_WORDS])
+        kind = "Very long pause" if gap >= VERY_LONG_PAUSE_SECONDS else "Long pause"
+        pauses.append({
+            "type": f"{kind} ({gap:.1f}s)",
+            "context": f"...{before} [pause] {after}...",
+            "start": round(words[index - 1][3], 2),
+            "duration": round(gap, 2)
+        })
+    return pauses
+
+
+def segment_pace(segments):
+    """Words per minute for every transcript segment"""
+    pace = []
+    for segment in segments:
+        duration = segment.end - segment.start
+        word_count = len(segment.text.split())
+        if duration <= 0 or word_count == 0:
+            continue
+        pace.append({
+            "start": round(float(segment.start), 2), "end": round(float(segment.end), 2),
+            "wpm": int(round(word_count / duration * 60))
+        })
+    return pace
+
+
+def analyze_delivery(segments):
+    """Local delivery analysis; keys match the fields the LLM used to generate"""
+    words = collect_words(segments)
+    return {
+        "fillerWordAnalysis": find_fillers(words),
+        "pauseAnalysis": find_pauses(words),
+        "segmentPace": segment_pace(segments)
+    }
+
+
+def delivery_prompt_facts(delivery):
+    """Measured delivery facts formatted as extra prompt input lines"""
+    fillers = ", ".join(f"'{item['word']}' x{item['count']}" for item in delivery["fillerWordAnalysis"]) or "none"
+    pauses = delivery["pauseAnalysis"]
+    longest = max((pause["duration"] for pause in pauses), default=0.0)
+    paces = [item["wpm"] for item in delivery["segmentPace"]]
+    pace_range = f"{min(paces)}-{max(paces)} WPM across segments" if paces else "N/A"
+    return (f"- Filler Words (measured): {fillers}\n"
+            f"    - Long Pauses (measured, > {LONG_PAUSE_SECONDS}s): {len(pauses)}, longest {longest:.1f}s\n"
+            f"    - Pace Variation (measured): {pace_range}")
@@ -0,0 +1,160 @@
+"""
+Streaming Transcription Module
+Incrementally transcribes audio chunks received while the user is still recording
+"""
+
+import threading
+from itertools import takewhile
+
+import numpy as np
+
+from audio_utils import SAMPLE_RATE, StreamDecoder, av, decode_audio
+from transcription import replace_fields, shift_segment
+
+
+def split_segments_at(segments, cutoff):
+    """
+    Split tail segments into (stable, partial_text, cut_seconds) using word timestamps
+    Words ending at or before cutoff are stable; the audio cut falls midway between the last
+    stable word and the next one so no word is clipped. Without word timestamps only whole
+    segments before the last one are stable.
+    """
+    if not segments:
+        return [], "", 0.0
+    if not all(getattr(segment, 'words', None) for segment in segments):
+        stable = segments[:-1]
+        return stable, segments[-1].text.strip(), stable[-1].end if stable else 0.0
+
+    stable, pending_words = [], []
+    for segment in segments:
+        if pending_words:
+            pending_words.extend(segment.words)
+            continue
+        kept = list(takewhile(lambda word: word.end <= cutoff, segment.words))
+        if len(kept) == len(segment.words):
+            stable.append(segment)
+            continue
+        if kept:
+            stable.append(replace_fields(segment, text="".join(word.word for word in kept), start=kept[0].start,
+                                         end=kept[-1].end, words=kept))
+        pending_words.extend(segment.words[len(kept):])
+    if not stable:
+        return [], "".join(word.word for word in pending_words).strip(), 0.0
+    last_end = stable[-1].end
+    cut = (last_end + pending_words[0].start) / 2 if pending_words else last_end
+    return stable, "".join(word.word for word in pending_words).strip(), max(last_end, cut)
+
+
+class StreamingSession:
+    """
+    Audio and transcript state for one live recording
+    Chunks are either raw 16 kHz mono int16 PCM ('pcm16') or pieces of a single encoded
+    stream such as MediaRecorder WebM/Opus ('webm'), which is decoded incrementally as it grows.
+    Words that end more than commit_lag_seconds before the end of the audio are committed;
+    only the audio after the last committed word is re-transcribed on the next update.
+    """
+
+    def __init__(self, stream_id, transcribe_fn, audio_format='pcm16', min_update_seconds=3.0, user_id=None,
+                 model_name=None, decoding_policy=None, commit_lag_seconds=2.0):
+        self.stream_id = stream_id
+        self.user_id = user_id
+        self.model_name = model_name
+        self.decoding_policy = decoding_policy
+        self.transcribe_fn = transcribe_fn
+        self.audio_format = audio_format
+        self.min_update_seconds = min_update_seconds
+        self.commit_lag_seconds = commit_lag_seconds
+        self.decoder = StreamDecoder() if audio_format != 'pcm16' and av is not None else None
+        self.pcm_chunks = []
+        self.encoded = bytearray()
+        self.committed_segments = []
+        self.committed_until = 0.0
+        self.partial_text = ""
+        self.received_seconds = 0.0
+        self.state_lock = threading.Lock()
+        self.transcribe_lock = threading.Lock()
+
+    def add_chunk(self, data):
+        """Append a chunk; returns True when enough new audio arrived for an update"""
+        with self.state_lock:
+            if self.audio_format == 'pcm16':
+                chunk = np.frombuffer(bytes(data), dtype=np.int16).astype(np.float32) / 32768.0
+                self.pcm_chunks.append(chunk)
+                self.received_seconds += len(chunk) / SAMPLE_RATE
+            elif self.decoder is not None:
+                self.decoder.feed(bytes(data))
+                # Decoding runs behind by at most a chunk, so the decoded duration is real time
+                self.received_seconds = self.decoder.decoded_seconds()
+            else:
+                self.encoded.extend(data)
+                # Without PyAV encoded sizes only approximate duration; ~16 kB/s is a typical Opus upper bound
+                self.received_seconds += len(data) / 16000.0
+            return self.received_seconds - self.committed_until >= self.min_update_seconds
+
+    def audio(self):
+        """All audio received so far as a 16 kHz float32 buffer"""
+        with self.state_lock:
+            if self.audio_format == 'pcm16':
+                if not self.pcm_chunks:
+                    return np.zeros(0, dtype=np.float32)
+                if len(self.pcm_chunks) > 1:
+                    self.pcm_chunks = [np.concatenate(self.pcm_chunks)]
+                return self.pcm_chunks[0]
+            if self.decoder is not None:
+                return self.decoder.samples()
+            encoded = bytes(self.encoded)
+        return decode_audio(encoded) if encoded else np.zeros(0, dtype=np.float32)
+
+    def update(self, final=False):
+        """
+        Transcribe the uncommitted tail and return the transcript state
+        Returns None if another update for this session is already running
+        """
+        if not self.transcribe_lock.acquire(blocking=final):
+            return None
+        try:
+            if final:
+                self.finish_input()
+            samples = self.audio()
+            start = int(self.committed_until * SAMPLE_RATE)
+            tail = samples[start:]
+            segments = list(self.transcribe_fn(tail)) if len(tail) else []
+
+            if final:
+                stable, partial, cut = segments, "", 0.0
+            else:
+                cutoff = len(tail) / SAMPLE_RATE - self.commit_lag_seconds
+                stable, partial, cut = split_segments_at(segments, cutoff)
+            offset = self.committed_until
+            for segment in stable:
+                # Re-base from the tail's timeline onto the whole recording
+                self.committed_segments.append(shift_segment(segment, -offset))
+            if stable and not final:
+                self.committed_until = offset + cut
+            self.partial_text = partial
+            return self.transcript_state()
+        finally:
+            self.transcribe_lock.release()
+
+    def transcript_state(self):
+        return {
+            "streamId": self.stream_id,
+            "committed": "".join(segment.text for segment in self.committed_segments).strip(),
+            "partial": self.partial_text,
+            "committedSeconds": round(self.committed_until, 2)
+        }
+
+    def finish_input(self):
+        """No more chunks are coming: drain the decoder so audio() holds the whole recording"""
+        if self.decoder is not None:
+            self.decoder.close()
+
+    def close(self):
+        """Stop the background decoder of an abandoned stream"""
+        if self.decoder is not None:
+            self.decoder.close(timeout=1.0)
+
+    def finalize(self):
+        """Transcribe whatever is left and return every segment of the recording"""
+        self.update(final=True)
+        return list(self.committed_segments)
@@ -0,0 +1,19 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Backend modules are flat files imported by name (as app.py does)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def wait_until():
+    """Poll condition() until it is truthy; fails the test if it never is"""
+    def wait(condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "condition not met in time"
+            time.sleep(0.01)
+    return wait
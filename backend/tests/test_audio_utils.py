@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from audio_utils import SAMPLE_RATE, detect_speech, speaking_duration
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_detect_speech_finds_voiced_regions():
+    samples = np.concatenate([silence(0.5), tone(1.0), silence(1.0), tone(0.5), silence(0.5)])
+
+    speech = detect_speech(samples)
+
+    assert speech == [pytest.approx((0.5, 1.5)), pytest.approx((2.5, 3.0))]
+    assert speaking_duration(speech) == pytest.approx(2.5)
+
+
+def test_detect_speech_bridges_short_gaps_and_drops_blips():
+    samples = np.concatenate([tone(1.0), silence(0.1), tone(1.0), silence(1.0), tone(0.04), silence(0.5)])
+
+    assert detect_speech(samples) == [pytest.approx((0.0, 2.1))]
+
+
+def test_detect_speech_ignores_silence_and_noise_floor():
+    assert detect_speech(silence(1.0)) == []
+    assert detect_speech(tone(1.0, amplitude=1e-4)) == []
+    assert detect_speech(np.zeros(10, dtype=np.float32)) == []
+    assert speaking_duration([]) == 0.0
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from caching import LRUCache, SingleFlight, SQLiteCache, TieredCache, content_hash
+
+
+def test_content_hash_separates_parts():
+    assert content_hash(b"ab", "c") == content_hash("ab", b"c")
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    cache = TieredCache(LRUCache(), SQLiteCache(str(tmp_path / "cache.db")))
+    cache.put("key", {"v": 1})
+    cache.memory.entries.clear()
+
+    assert cache.get("key") == {"v": 1}
+    assert "key" in cache.memory.entries
+    assert cache.stats()["disk"]["hits"] == 1
+
+
+def test_lru_expires_entries_after_ttl():
+    cache = LRUCache(ttl=60)
+    cache.put("fresh", 1)
+    cache.put("stale", 2, created=time.time() - 120)
+
+    assert cache.get("fresh") == 1
+    assert cache.get("stale") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_tiered_cache_promotes_with_the_original_creation_time(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"), ttl=60)
+    cache = TieredCache(LRUCache(), disk)
+    disk.put("key", {"v": 1})
+    with disk.lock, disk.connection:
+        disk.connection.execute("UPDATE cache SET created = ?", (time.time() - 50,))
+
+    assert cache.memory.ttl == 60
+    assert cache.get("key") == {"v": 1}
+    # Promoted 50 s into its 60 s life, so the memory copy must not outlive the disk one
+    assert cache.memory.entries["key"][1] < time.time() - 49
+
+
+def test_disk_cache_expires_entries_after_ttl(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"), ttl=60)
+    disk.put("key", {"v": 1})
+    with disk.lock, disk.connection:
+        disk.connection.execute("UPDATE cache SET created = ?", (time.time() - 120,))
+
+    assert disk.get("key") is None
+    assert disk.stats()["entries"] == 0
+
+
+def test_single_flight_runs_concurrent_callers_once():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "value"
+
+    def caller():
+        results.append(flights.do("key", compute))
+
+    threads = [threading.Thread(target=caller) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flights.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("value", False)] + [("value", True)] * 3
+    assert flights.stats() == {"inFlight": 0, "leaders": 1, "coalesced": 3}
+
+
+def test_single_flight_shares_exceptions_and_forgets_finished_keys():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do("key", fail)
+    assert flights.do("key", lambda: 42) == (42, False)
+    assert flights.stats()["inFlight"] == 0
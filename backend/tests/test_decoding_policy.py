@@ -0,0 +1,34 @@
+import pytest
+
+from decoding_policy import DecodingPolicy, describe_policy
+
+
+@pytest.mark.parametrize("depth, duration, expected", [
+    (0, 30, "accurate"),
+    (0, None, "accurate"),
+    (0, 300, "balanced"),
+    (4, 30, "balanced"),
+    (8, 30, "greedy"),
+    (8, 300, "greedy"),
+])
+def test_level_follows_load_and_clip_length(depth, duration, expected):
+    policy = DecodingPolicy(busy_queue_depth=4, saturated_queue_depth=8, long_clip_seconds=120)
+
+    assert policy.level(depth, duration) == expected
+
+
+def test_choose_returns_options_the_batched_pipeline_honours():
+    name, options = DecodingPolicy().choose(queue_depth=100)
+
+    assert name == "greedy"
+    assert set(options) == {"beam_size", "patience", "temperature", "vad_parameters"}
+    assert isinstance(options["temperature"], float)
+    assert describe_policy(name, options, 100)["beamSize"] == 1
+
+
+def test_choose_copies_vad_parameters():
+    policy = DecodingPolicy()
+    _, options = policy.choose(0)
+    options["vad_parameters"]["speech_pad_ms"] = 0
+
+    assert policy.choose(0)[1]["vad_parameters"]["speech_pad_ms"] != 0
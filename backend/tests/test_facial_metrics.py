@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from facial_metrics import (  # noqa: E402
+    MAX_TARGET_FPS, MIN_TARGET_FPS, FacialSession, FacialSessionRegistry, RunningStats
+)
+
+
+def test_registry_reuses_a_live_session():
+    registry = FacialSessionRegistry()
+    session = registry.start("sid", "one")
+
+    assert registry.get("sid", "one") is session
+    assert registry.get("sid", "two", create=False) is None
+
+
+def test_idle_sessions_are_evicted():
+    registry = FacialSessionRegistry(idle_ttl=5)
+    registry.start("sid", "old").last_seen -= 10
+    fresh = registry.start("sid", "fresh")
+
+    assert registry.get("sid", "old", create=False) is None
+    assert registry.get("sid", "fresh") is fresh
+    assert registry.stats()["evicted"] == 1
+
+
+def test_least_recently_used_session_is_dropped_over_capacity():
+    registry = FacialSessionRegistry(max_sessions=2)
+    registry.start("a", "1")
+    registry.start("b", "1")
+    registry.get("a", "1")
+    registry.start("c", "1")
+
+    assert registry.get("b", "1", create=False) is None
+    assert registry.get("a", "1", create=False) is not None
+    assert registry.stats() == {"sessions": 2, "maxSessions": 2, "evicted": 1}
+
+
+def test_disconnect_drops_every_session_of_the_client():
+    registry = FacialSessionRegistry()
+    registry.start("sid", "one")
+    registry.start("sid", "two")
+    registry.start("other", "one")
+
+    registry.drop_connection("sid")
+
+    assert registry.stats()["sessions"] == 1
+    assert registry.end("other", "one") is not None
+
+
+def test_running_stats_matches_numpy():
+    values = np.random.default_rng(0).normal(50.0, 12.0, size=1000)
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(np.mean(values))
+    assert stats.variance() == pytest.approx(np.var(values))
+
+
+def test_running_stats_is_stable_for_large_offsets():
+    values = 1e9 + np.array([4.0, 7.0, 13.0, 16.0])
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    assert stats.variance() == pytest.approx(22.5)
+
+
+def test_empty_running_stats():
+    assert RunningStats().variance() == 0.0
+
+
+def test_mailbox_keeps_only_the_newest_frame():
+    session = FacialSession(("sid", "one"))
+
+    assert session.offer(b"frame1")  # first frame: caller starts draining
+    assert not session.offer(b"frame2")  # drainer already running
+    assert not session.offer(b"frame3")
+
+    assert session.take() == b"frame3"
+    assert session.take() is None  # drainer stops
+    assert session.pacing()["framesReceived"] == 3
+    assert session.pacing()["framesDropped"] == 2
+
+    # With the drainer stopped, the next frame starts a new one
+    assert session.offer(b"frame4")
+
+
+def test_pacing_targets_what_analysis_can_keep_up_with():
+    session = FacialSession(("sid", "one"))
+    assert session.pacing()["targetFps"] == MAX_TARGET_FPS
+
+    session.record_analysis(0.4)
+    assert session.pacing()["targetFps"] == 2.0  # 80% headroom at 400 ms per frame
+
+    session.record_analysis(100.0)
+    assert session.pacing()["targetFps"] == MIN_TARGET_FPS
@@ -0,0 +1,61 @@
+from concurrent.futures import TimeoutError as FutureTimeout
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from inference_workers import InferencePool, run_task
+from prosody import analyze_prosody, empty_prosody
+from transcription import SAMPLE_RATE
+
+
+def test_transcribe_task_uses_the_named_tier():
+    calls = []
+
+    class FakeScheduler:
+        def transcribe(self, samples, **options):
+            calls.append(options)
+            return [SimpleNamespace(text=" hi", start=0.0, end=0.5,
+                                    words=[SimpleNamespace(word=" hi", start=0.0, end=0.5, probability=0.9)])]
+
+    tiers = {"base": SimpleNamespace(scheduler=FakeScheduler())}
+
+    result = run_task(tiers, "transcribe", ("base", np.zeros(SAMPLE_RATE, dtype=np.float32), {"beam_size": 1}))
+
+    assert calls == [{"beam_size": 1}]
+    assert result == [{"text": " hi", "start": 0.0, "end": 0.5,
+                       "words": [{"word": " hi", "start": 0.0, "end": 0.5, "probability": 0.9}]}]
+
+
+def test_unknown_task_is_rejected():
+    with pytest.raises(ValueError):
+        run_task({}, "summarize", ())
+
+
+def test_timed_out_call_does_not_count_as_pending():
+    # No workers, so the task is never picked up
+    pool = InferencePool(0, {"models": []}, task_timeout=0.1)
+
+    with pytest.raises(FutureTimeout):
+        pool.call("prosody", np.zeros(SAMPLE_RATE, dtype=np.float32), None)
+    assert pool.pending() == 0
+    assert pool.status()["inFlight"] == 0
+
+
+def tone_with_silence():
+    """Two seconds of a 220 Hz tone with 0.2 s of silence at each end"""
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    samples = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    samples[:int(0.2 * SAMPLE_RATE)] = 0
+    samples[-int(0.2 * SAMPLE_RATE):] = 0
+    return samples, [(0.2, 1.8)]
+
+
+def test_prosody_task_passes_speech_intervals():
+    samples, speech = tone_with_silence()
+
+    result = run_task({}, "prosody", (samples, speech))
+
+    assert result != empty_prosody()
+    assert result["mean_pitch"] == pytest.approx(220, rel=0.05)
+    assert result == analyze_prosody(samples, speech=speech)
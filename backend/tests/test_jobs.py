@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue, JobQueueFull
+
+
+def test_job_runs_and_reports_stages(wait_until):
+    updates = []
+
+    def handler(payload, report_stage):
+        report_stage("transcript", 0.5)
+        return {"echo": payload}
+
+    jobs = JobQueue(handler, num_workers=1, on_update=updates.append)
+    jobs.start()
+    job_id = jobs.submit("hello")
+
+    wait_until(lambda: jobs.get(job_id)["status"] == "completed")
+    job = jobs.get(job_id)
+    assert job["result"] == {"echo": "hello"}
+    assert job["stages"] == {"transcript": 0.5}
+    assert [update["status"] for update in updates][0] == "queued"
+    assert "running" in [update["status"] for update in updates]
+
+
+def test_failed_job_keeps_the_error(wait_until):
+    def handler(payload, report_stage):
+        raise ValueError("no speech")
+
+    jobs = JobQueue(handler, num_workers=1)
+    jobs.start()
+    job_id = jobs.submit(None)
+
+    wait_until(lambda: jobs.get(job_id)["status"] == "failed")
+    assert jobs.get(job_id)["error"] == "no speech"
+
+
+def test_submit_rejects_when_the_queue_is_full():
+    jobs = JobQueue(lambda payload, report_stage: None, num_workers=1, max_pending=2)
+    # Not started, so nothing drains the queue
+    jobs.submit(1)
+    jobs.submit(2)
+
+    with pytest.raises(JobQueueFull):
+        jobs.submit(3)
+    assert jobs.queue_depth() == 2
+
+
+def test_finished_jobs_expire_after_result_ttl(wait_until):
+    release = threading.Event()
+    jobs = JobQueue(lambda payload, report_stage: release.wait(5), num_workers=1, result_ttl=0.05)
+    jobs.start()
+    job_id = jobs.submit(None)
+    release.set()
+    wait_until(lambda: jobs.get(job_id)["status"] == "completed")
+
+    time.sleep(0.1)
+    jobs.submit(None)  # eviction runs on submit
+
+    assert jobs.get(job_id) is None
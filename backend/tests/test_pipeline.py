@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline import Pipeline
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def test_stages_receive_their_dependencies_results(executor):
+    pipeline = (Pipeline(executor)
+                .add_stage("decode", lambda: 2)
+                .add_stage("double", lambda decode: decode * 2, depends_on=["decode"])
+                .add_stage("square", lambda decode: decode ** 2, depends_on=["decode"])
+                .add_stage("total", lambda double, square: double + square, depends_on=["double", "square"]))
+    completed = []
+
+    results = pipeline.run(on_stage_complete=lambda name, seconds: completed.append(name))
+
+    assert results == {"decode": 2, "double": 4, "square": 4, "total": 8}
+    assert completed[0] == "decode" and completed[-1] == "total"
+    assert set(pipeline.timings) == {"decode", "double", "square", "total"}
+
+
+def test_independent_stages_run_concurrently(executor):
+    # Each stage waits for the other; this only finishes if both run at once
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = (Pipeline(executor)
+                .add_stage("prosody", lambda: barrier.wait() is not None)
+                .add_stage("transcript", lambda: barrier.wait() is not None))
+
+    assert pipeline.run() == {"prosody": True, "transcript": True}
+
+
+def test_failure_is_raised_and_dependents_are_skipped(executor):
+    ran = []
+
+    def fail():
+        raise RuntimeError("decode failed")
+
+    pipeline = (Pipeline(executor)
+                .add_stage("decode", fail)
+                .add_stage("transcript", lambda decode: ran.append(decode), depends_on=["decode"]))
+
+    with pytest.raises(RuntimeError, match="decode failed"):
+        pipeline.run()
+    assert ran == []
+
+
+def test_add_stage_validates_the_graph(executor):
+    pipeline = Pipeline(executor).add_stage("decode", lambda: None)
+
+    with pytest.raises(ValueError):
+        pipeline.add_stage("decode", lambda: None)
+    with pytest.raises(ValueError):
+        pipeline.add_stage("transcript", lambda vad: None, depends_on=["vad"])
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from speech_metrics import analyze_delivery, delivery_prompt_facts
+
+
+def transcript(*words):
+    """One segment from (word, start, end) tuples"""
+    items = [SimpleNamespace(word=f" {word}", start=start, end=end) for word, start, end in words]
+    return SimpleNamespace(text=" ".join(word for word, _, _ in words), start=items[0].start, end=items[-1].end,
+                           words=items)
+
+
+def test_fillers_count_words_and_phrases():
+    segment = transcript(("Um,", 0.0, 0.2), ("you", 0.3, 0.4), ("know", 0.4, 0.6), ("it's", 0.7, 0.8),
+                         ("like", 0.9, 1.0), ("um", 1.1, 1.2), ("great.", 1.3, 1.6))
+
+    fillers = analyze_delivery([segment])["fillerWordAnalysis"]
+
+    assert fillers == [{"word": "um", "count": 2}, {"word": "you know", "count": 1}, {"word": "like", "count": 1}]
+
+
+def test_long_pauses_are_reported_with_context():
+    segment = transcript(("first", 0.0, 0.5), ("point", 0.5, 1.0), ("second", 1.5, 2.0),
+                         ("point", 4.5, 5.0))
+
+    pauses = analyze_delivery([segment])["pauseAnalysis"]
+
+    # 0.5 s is below LONG_PAUSE_SECONDS; only the 2.5 s gap counts
+    assert len(pauses) == 1
+    assert pauses[0]["type"] == "Very long pause (2.5s)"
+    assert pauses[0]["start"] == 2.0 and pauses[0]["duration"] == 2.5
+    assert pauses[0]["context"] == "...first point second [pause] point..."
+
+
+def test_segment_pace_is_words_per_minute():
+    fast = transcript(("one", 0.0, 0.5), ("two", 0.5, 1.0), ("three", 1.0, 1.5), ("four", 1.5, 2.0))
+    slow = transcript(("five", 3.0, 4.0), ("six", 4.0, 6.0))
+
+    delivery = analyze_delivery([fast, slow])
+
+    assert delivery["segmentPace"] == [{"start": 0.0, "end": 2.0, "wpm": 120},
+                                       {"start": 3.0, "end": 6.0, "wpm": 40}]
+    assert "40-120 WPM" in delivery_prompt_facts(delivery)
@@ -0,0 +1,105 @@
+import io
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from audio_utils import SAMPLE_RATE, av
+from streaming import StreamingSession, split_segments_at
+
+
+def segment(*words):
+    """Segment built from (word, start, end) tuples"""
+    items = [SimpleNamespace(word=word, start=start, end=end) for word, start, end in words]
+    return SimpleNamespace(text="".join(word for word, _, _ in words), start=items[0].start, end=items[-1].end,
+                           words=items)
+
+
+def test_split_commits_words_before_the_cutoff():
+    segments = [segment((" one", 0.0, 0.4), (" two", 0.5, 0.9), (" three", 1.6, 2.0))]
+
+    stable, partial, cut = split_segments_at(segments, cutoff=1.0)
+
+    assert [s.text for s in stable] == [" one two"]
+    assert stable[0].end == 0.9
+    assert partial == "three"
+    assert cut == pytest.approx(1.25)  # midway through the silence before "three"
+
+
+def test_split_keeps_whole_segments_and_carries_later_ones():
+    segments = [segment((" a", 0.0, 0.5)), segment((" b", 1.0, 1.5)), segment((" c", 2.0, 2.5))]
+
+    stable, partial, cut = split_segments_at(segments, cutoff=1.2)
+
+    assert [s.text for s in stable] == [" a"]
+    assert partial == "b c"
+    assert cut == pytest.approx(0.75)
+
+
+def test_split_without_word_timestamps_holds_back_the_last_segment():
+    segments = [SimpleNamespace(text=" a", start=0.0, end=1.0, words=None),
+                SimpleNamespace(text=" b", start=1.0, end=2.0, words=None)]
+
+    stable, partial, cut = split_segments_at(segments, cutoff=5.0)
+
+    assert [s.text for s in stable] == [" a"]
+    assert (partial, cut) == ("b", 1.0)
+
+
+def test_split_with_nothing_stable():
+    stable, partial, cut = split_segments_at([segment((" late", 3.0, 3.5))], cutoff=1.0)
+
+    assert (stable, partial, cut) == ([], "late", 0.0)
+
+
+def encode_webm(seconds, bit_rate=32000):
+    """A MediaRecorder-like WebM/Opus recording of a pulsed tone"""
+    rate = 48000
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)).astype(np.float32)
+    buffer = io.BytesIO()
+    with av.open(buffer, mode="w", format="webm") as container:
+        stream = container.add_stream("libopus", rate=rate)
+        stream.layout = "mono"
+        stream.bit_rate = bit_rate
+        stream.codec_context.open()
+        resampler = av.AudioResampler(format=stream.codec_context.format.name, layout="mono", rate=rate,
+                                      frame_size=stream.codec_context.frame_size)
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="flt", layout="mono")
+        frame.sample_rate = rate
+        for resampled in list(resampler.resample(frame)) + list(resampler.resample(None)):
+            container.mux(stream.encode(resampled))
+        container.mux(stream.encode(None))
+    return buffer.getvalue()
+
+
+def word_every_half_second(tail):
+    """Fake transcriber: one word per 0.5 s of audio"""
+    words = [SimpleNamespace(word=" w", start=start, end=start + 0.4)
+             for start in np.arange(0.0, len(tail) / SAMPLE_RATE - 0.4, 0.5)]
+    if not words:
+        return []
+    return [SimpleNamespace(text="".join(word.word for word in words), start=words[0].start, end=words[-1].end,
+                            words=words)]
+
+
+@pytest.mark.skipif(av is None, reason="PyAV not installed")
+def test_encoded_stream_updates_keep_pace_with_real_time():
+    seconds = 30
+    data = encode_webm(seconds)
+    chunk_size = len(data) // seconds  # one MediaRecorder timeslice per second
+    session = StreamingSession("s", word_every_half_second, audio_format="webm", min_update_seconds=3.0)
+    updates = 0
+    for start in range(0, len(data), chunk_size):
+        if session.add_chunk(data[start:start + chunk_size]):
+            session.update()
+            updates += 1
+        time.sleep(0.02)  # let the background decoder catch up, as real time between chunks would
+
+    # ~32 kbps Opus is ~4 kB/s; a bytes-based estimate would fire only a couple of times
+    assert updates >= seconds // 3
+    assert session.committed_until > seconds - 5
+
+    session.finish_input()
+    assert len(session.audio()) / SAMPLE_RATE == pytest.approx(seconds, abs=0.1)
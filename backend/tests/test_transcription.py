@@ -0,0 +1,168 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import transcription
+from transcription import SAMPLE_RATE, TranscriptionScheduler, split_at_silence, transcribe_chunked
+
+
+def make_segment(text, start, end):
+    return SimpleNamespace(text=text, start=start, end=end,
+                           words=[SimpleNamespace(word=text, start=start, end=end, probability=1.0)])
+
+
+class FakeBatched:
+    """Stands in for BatchedInferencePipeline: one segment per clip, 0.1 s into it"""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, clip_timestamps, vad_filter, batch_size, **options):
+        self.calls.append({"samples": len(audio), "clips": clip_timestamps, "options": options})
+        segments = [make_segment(f"clip{index}", clip["start"] + 0.1, clip["end"])
+                    for index, clip in enumerate(clip_timestamps)]
+        return iter(segments), None
+
+
+@pytest.fixture
+def whole_clip_vad(monkeypatch):
+    """Treat every request as a single voiced window"""
+    monkeypatch.setattr(transcription, "speech_clips",
+                        lambda samples, vad_parameters=None: [(0.0, len(samples) / SAMPLE_RATE)])
+
+
+def transcribe_concurrently(scheduler, requests):
+    results = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def run(index, samples, options):
+        barrier.wait()
+        results[index] = scheduler.transcribe(samples, **options)
+
+    threads = [threading.Thread(target=run, args=(index, samples, options))
+               for index, (samples, options) in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_scheduler_batches_requests_and_maps_segments_back(whole_clip_vad):
+    batched = FakeBatched()
+    scheduler = TranscriptionScheduler(None, max_batch_size=3, max_wait_ms=500, batched=batched)
+    durations = [1.0, 2.0, 0.5]
+    requests = [(np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32), {"beam_size": 1})
+                for seconds in durations]
+
+    results = transcribe_concurrently(scheduler, requests)
+
+    assert len(batched.calls) == 1
+    assert batched.calls[0]["samples"] == int(sum(durations) * SAMPLE_RATE)
+    assert batched.calls[0]["options"] == {"beam_size": 1}
+    assert scheduler.stats == {"requests": 3, "batches": 1, "largest_batch": 3}
+    for segments, seconds in zip(results, durations):
+        # Each request gets back exactly its own clip's segment, in its own time base
+        assert len(segments) == 1
+        assert segments[0].start == pytest.approx(0.1)
+        assert segments[0].end == pytest.approx(seconds)
+        assert segments[0].words[0].start == pytest.approx(0.1)
+
+
+def test_scheduler_keeps_different_options_apart(whole_clip_vad):
+    batched = FakeBatched()
+    scheduler = TranscriptionScheduler(None, max_batch_size=4, max_wait_ms=200, batched=batched)
+    samples = np.zeros(SAMPLE_RATE, dtype=np.float32)
+
+    results = transcribe_concurrently(scheduler, [(samples, {"beam_size": 1}), (samples, {"beam_size": 5})])
+
+    assert sorted(call["options"]["beam_size"] for call in batched.calls) == [1, 5]
+    assert all(len(segments) == 1 for segments in results)
+
+
+def test_scheduler_skips_the_model_without_speech(monkeypatch):
+    monkeypatch.setattr(transcription, "speech_clips", lambda samples, vad_parameters=None: [])
+    batched = FakeBatched()
+    scheduler = TranscriptionScheduler(None, max_wait_ms=0, batched=batched)
+
+    assert scheduler.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32)) == []
+    assert batched.calls == []
+
+
+def test_scheduler_fails_the_batch_when_decoding_raises(whole_clip_vad):
+    class BrokenBatched:
+        def transcribe(self, *args, **kwargs):
+            raise RuntimeError("decoder exploded")
+
+    scheduler = TranscriptionScheduler(None, max_wait_ms=0, batched=BrokenBatched())
+    with pytest.raises(RuntimeError, match="decoder exploded"):
+        scheduler.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+
+@pytest.fixture
+def fake_vad(monkeypatch):
+    """Replace Silero with fixed voiced regions (in samples)"""
+    import faster_whisper.vad
+
+    def use(regions):
+        monkeypatch.setattr(faster_whisper.vad, "get_speech_timestamps",
+                            lambda samples, options: [{"start": start, "end": end} for start, end in regions])
+    return use
+
+
+def test_split_at_silence_cuts_inside_gaps(fake_vad):
+    regions = [(0, 8000), (12000, 20000), (24000, 30000), (36000, 44000)]
+    fake_vad(regions)
+
+    chunks = split_at_silence(np.zeros(48000, dtype=np.float32), chunk_seconds=1.0)
+
+    assert chunks == [(0, 10000), (10000, 22000), (22000, 33000), (33000, 48000)]
+    for start, _ in chunks[1:]:
+        assert not any(region_start < start < region_end for region_start, region_end in regions)
+
+
+def test_split_at_silence_hard_cuts_long_regions(fake_vad):
+    fake_vad([(0, 100000)])
+
+    chunks = split_at_silence(np.zeros(100000, dtype=np.float32), chunk_seconds=1.0)
+
+    assert chunks[0][0] == 0 and chunks[-1][1] == 100000
+    assert all(end == next_start for (_, end), (next_start, _) in zip(chunks, chunks[1:]))
+    assert all(end - start <= 2 * SAMPLE_RATE for start, end in chunks)
+
+
+def test_transcribe_chunked_shifts_segments_to_clip_time(fake_vad):
+    fake_vad([(0, 8000), (12000, 20000), (24000, 30000), (36000, 44000)])
+    seen = []
+
+    def transcribe(chunk, **options):
+        seen.append(options)
+        return [make_segment(str(len(chunk)), 0.1, len(chunk) / SAMPLE_RATE)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        segments = transcribe_chunked(transcribe, np.zeros(48000, dtype=np.float32), executor, 1.0, language="en")
+
+    starts = [0, 10000, 22000, 33000]
+    ends = [10000, 22000, 33000, 48000]
+    assert [segment.text for segment in segments] == [str(end - start) for start, end in zip(starts, ends)]
+    assert [segment.start for segment in segments] == pytest.approx([start / SAMPLE_RATE + 0.1 for start in starts])
+    assert [segment.end for segment in segments] == pytest.approx([end / SAMPLE_RATE for end in ends])
+    assert [segment.words[0].start for segment in segments] == pytest.approx([s.start for s in segments])
+    assert all(options == {"language": "en"} for options in seen)
+
+
+def test_transcribe_chunked_passes_short_clips_through(fake_vad):
+    fake_vad([(0, 8000)])
+    calls = []
+
+    def transcribe(chunk, **options):
+        calls.append(len(chunk))
+        return [make_segment("hi", 0.1, 0.5)]
+
+    segments = transcribe_chunked(transcribe, np.zeros(16000, dtype=np.float32), None, 30.0)
+
+    assert calls == [16000]
+    assert segments[0].start == 0.1
@@ -0,0 +1,92 @@
+import json
+import os
+import time
+
+from upload_outbox import FAILED, PENDING, UPLOADED, LocalUploadTarget, UploadOutbox
+
+
+def never_called(path, public_id):
+    raise AssertionError("outbox was not started, nothing should upload")
+
+
+def test_enqueued_upload_is_delivered(tmp_path, wait_until):
+    target = LocalUploadTarget(str(tmp_path / "remote"), "http://files")
+    updates = []
+    outbox = UploadOutbox(str(tmp_path / "outbox"), target, on_update=updates.append)
+    outbox.start()
+
+    upload_id = outbox.enqueue(b"audio", "sessions/one", suffix=".ogg")
+    wait_until(lambda: updates)  # reported after the local copy is removed
+
+    assert updates[0]["uploadId"] == upload_id
+    assert outbox.get(upload_id)["status"] == UPLOADED
+    assert outbox.get(upload_id)["url"] == "http://files/sessions_one.ogg"
+    assert (tmp_path / "remote" / "sessions_one.ogg").read_bytes() == b"audio"
+    assert not (tmp_path / "outbox" / f"{upload_id}.ogg").exists()
+
+
+def test_pending_uploads_survive_a_restart(tmp_path, wait_until):
+    directory = str(tmp_path / "outbox")
+    upload_id = UploadOutbox(directory, never_called).enqueue(b"audio", "sessions/two")
+
+    uploaded = []
+    outbox = UploadOutbox(directory, lambda path, public_id: uploaded.append(public_id) or "http://files/two")
+    outbox.start()
+
+    wait_until(lambda: outbox.get(upload_id) and outbox.get(upload_id)["status"] == UPLOADED)
+    assert uploaded == ["sessions/two"]
+
+
+def test_failing_upload_is_retried_then_given_up(tmp_path, wait_until):
+    attempts = []
+
+    def flaky(path, public_id):
+        attempts.append(public_id)
+        raise ConnectionError("down")
+
+    outbox = UploadOutbox(str(tmp_path), flaky, max_attempts=3, backoff_base=0.01, backoff_max=0.01)
+    outbox.start()
+    upload_id = outbox.enqueue(b"audio", "sessions/three")
+
+    wait_until(lambda: outbox.get(upload_id)["status"] == FAILED)
+    assert len(attempts) == 3
+    assert outbox.get(upload_id)["error"] == "down"
+
+
+def write_record(directory, upload_id, status, age):
+    updated = time.time() - age
+    record = {"uploadId": upload_id, "publicId": upload_id, "file": f"{upload_id}.wav", "status": status,
+              "attempts": 1, "url": None, "error": None, "meta": {},
+              "createdAt": updated, "updatedAt": updated, "nextAttemptAt": updated}
+    with open(os.path.join(directory, f"{upload_id}.json"), "w") as f:
+        json.dump(record, f)
+    with open(os.path.join(directory, f"{upload_id}.wav"), "wb") as f:
+        f.write(b"audio")
+
+
+def test_start_drops_expired_records(tmp_path):
+    directory = str(tmp_path)
+    write_record(directory, "old", FAILED, age=120)
+    write_record(directory, "recent", FAILED, age=1)
+
+    outbox = UploadOutbox(directory, never_called, num_workers=0, retention=60)
+    outbox.start()
+
+    assert outbox.get("old") is None
+    assert sorted(os.listdir(directory)) == ["recent.json", "recent.wav"]
+    assert outbox.get("recent")["status"] == FAILED
+
+
+def test_expired_records_are_pruned_while_running(tmp_path):
+    directory = str(tmp_path)
+    write_record(directory, "finished", UPLOADED, age=0)
+    outbox = UploadOutbox(directory, never_called, num_workers=0, retention=0.5, prune_interval=0)
+    outbox.start()
+    assert outbox.get("finished") is not None
+
+    time.sleep(0.6)
+    upload_id = outbox.enqueue(b"audio", "sessions/four")
+
+    assert outbox.get("finished") is None
+    assert not os.path.exists(os.path.join(directory, "finished.json"))
+    assert outbox.get(upload_id)["status"] == PENDING
@@ -0,0 +1,40 @@
+import pytest
+
+from whisper_registry import WhisperRegistry, WhisperTier
+
+
+class IdleScheduler:
+    stats = {}
+
+    def queue_depth(self):
+        return 0
+
+
+def registry(devices=("cuda", "cuda", "cuda"), depth=0, cpu_max_model=""):
+    tiers = [WhisperTier(name, IdleScheduler(), device) for name, device in zip(["base", "small", "medium"], devices)]
+    return WhisperRegistry(tiers, long_clip_seconds=120, busy_queue_depth=4, cpu_max_model=cpu_max_model,
+                           queue_depth_fn=lambda: depth)
+
+
+@pytest.mark.parametrize("duration, depth, expected", [
+    (30, 0, "medium"),    # idle, short clip: most accurate
+    (300, 0, "small"),    # long clip: one step down
+    (30, 4, "small"),     # busy: one step down
+    (300, 4, "base"),     # long and busy
+    (30, 8, "base"),      # saturated: fastest
+    (None, 0, "medium"),  # live streams have no duration
+])
+def test_select_steps_down_for_long_clips_and_load(duration, depth, expected):
+    assert registry(depth=depth).select(duration).name == expected
+
+
+def test_cpu_tiers_are_capped():
+    cpu = registry(devices=("cpu", "cpu", "cpu"), cpu_max_model="small")
+
+    assert cpu.select(30).name == "small"
+    assert cpu.select(300).name == "base"
+
+
+def test_registry_needs_a_tier():
+    with pytest.raises(ValueError):
+        WhisperRegistry([])
@@ -0,0 +1,229 @@
+"""
+Transcription Scheduler Module
+Micro-batches concurrent Whisper requests through faster-whisper's batched inference path
+"""
+
+import dataclasses
+import queue
+import threading
+import time
+import traceback
+from bisect import bisect_right
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000
+MAX_CLIP_SECONDS = 30.0
+
+
+def shift_segment(segment, offset):
+    """Return a copy of a Whisper segment (and its words) moved by offset seconds"""
+    if not offset:
+        return segment
+    words = getattr(segment, 'words', None)
+    if words:
+        words = [replace_fields(word, start=word.start - offset, end=word.end - offset) for word in words]
+    return replace_fields(segment, start=segment.start - offset, end=segment.end - offset, words=words)
+
+
+def replace_fields(item, **changes):
+    """Copy of a segment/word (dataclass, namedtuple or SimpleNamespace) with some fields changed"""
+    if dataclasses.is_dataclass(item):
+        fields = {field.name for field in dataclasses.fields(item)}
+        return dataclasses.replace(item, **{k: v for k, v in changes.items() if k in fields})
+    if hasattr(item, '_replace'):
+        fields = set(item._fields)
+        return item._replace(**{k: v for k, v in changes.items() if k in fields})
+    return SimpleNamespace(**{**vars(item), **changes})
+
+
+def segments_to_dicts(segments):
+    """JSON-serialisable form of Whisper segments (the fields the analysis uses)"""
+    return [{
+        "text": segment.text, "start": segment.start, "end": segment.end,
+        "words": [{"word": word.word, "start": word.start, "end": word.end,
+                   "probability": getattr(word, 'probability', None)}
+                  for word in (getattr(segment, 'words', None) or [])]
+    } for segment in segments]
+
+
+def segments_from_dicts(items):
+    """Rebuild segment-like objects from segments_to_dicts output"""
+    return [SimpleNamespace(text=item["text"], start=item["start"], end=item["end"],
+                            words=[SimpleNamespace(**word) for word in item["words"]])
+            for item in items]
+
+
+def speech_clips(samples, vad_parameters=None, max_clip_seconds=MAX_CLIP_SECONDS):
+    """
+    Voiced regions of a clip grouped into windows of at most max_clip_seconds
+    Returns [(start_seconds, end_seconds), ...] relative to the clip
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    max_len = int(max_clip_seconds * SAMPLE_RATE)
+    clips = []
+    for region in get_speech_timestamps(samples, VadOptions(**(vad_parameters or {}))):
+        start, end = region['start'], region['end']
+        if clips and end - clips[-1][0] <= max_len:
+            clips[-1][1] = end
+            continue
+        while end - start > max_len:
+            clips.append([start, start + max_len])
+            start += max_len
+        clips.append([start, end])
+    return [(start / SAMPLE_RATE, end / SAMPLE_RATE) for start, end in clips]
+
+
+def split_at_silence(samples, chunk_seconds, vad_parameters=None):
+    """
+    Cut a long clip into consecutive chunks of roughly chunk_seconds, each cut placed in the
+    middle of a silence between two voiced regions so no word is split
+    Returns [(start_sample, end_sample), ...] covering the whole clip
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    target = int(chunk_seconds * SAMPLE_RATE)
+    cuts = [0]
+    previous_end = None
+    for region in get_speech_timestamps(samples, VadOptions(**(vad_parameters or {}))):
+        if previous_end is not None and region['end'] - cuts[-1] > target:
+            cuts.append((previous_end + region['start']) // 2)
+        # A single region longer than two chunks (no usable silence) is cut hard
+        while region['end'] - cuts[-1] > 2 * target:
+            cuts.append(cuts[-1] + target)
+        previous_end = region['end']
+    cuts.append(len(samples))
+    return [(start, end) for start, end in zip(cuts, cuts[1:]) if end > start]
+
+
+def transcribe_chunked(transcribe, samples, executor, chunk_seconds, **options):
+    """
+    Transcribe a long clip as silence-aligned chunks decoded concurrently
+    transcribe(chunk, **options) is a scheduler's transcribe; the chunks reach it together, so
+    they are decoded in one batch (or spread over the inference workers). Segments come back
+    shifted to clip time, in order.
+    """
+    chunks = split_at_silence(samples, chunk_seconds, options.get('vad_parameters'))
+    if len(chunks) < 2:
+        return transcribe(samples, **options)
+    futures = [executor.submit(transcribe, samples[start:end], **options) for start, end in chunks]
+    segments = []
+    for (start, _), future in zip(chunks, futures):
+        offset = start / SAMPLE_RATE
+        segments.extend(shift_segment(segment, -offset) for segment in future.result())
+    return segments
+
+
+class _Request:
+    def __init__(self, samples, options):
+        self.samples = samples
+        self.options = options
+        self.key = tuple(sorted(options.items()))
+        self.future = Future()
+
+
+class TranscriptionScheduler:
+    """
+    Owns all access to a WhisperModel
+    Requests arriving within max_wait_ms of each other (and with identical decoding options)
+    are concatenated and decoded together, up to max_batch_size requests per batch
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait_ms=50, inference_batch_size=16, batched=None):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.inference_batch_size = inference_batch_size
+        if batched is None:
+            # Needs faster-whisper >= 1.2, which takes clip_timestamps in seconds (1.1 wanted samples)
+            from faster_whisper import BatchedInferencePipeline
+            batched = BatchedInferencePipeline(model=model)
+        self.batched = batched
+        self.requests = queue.Queue()
+        self.deferred = []
+        self.stats = {"requests": 0, "batches": 0, "largest_batch": 0}
+        self.dispatcher = threading.Thread(target=self._dispatch_loop, name="whisper-scheduler", daemon=True)
+        self.dispatcher.start()
+
+    def transcribe(self, samples, **options):
+        """Transcribe a 16 kHz float32 buffer; blocks until its batch finishes and returns the segments"""
+        request = _Request(samples, options)
+        self.requests.put(request)
+        return request.future.result()
+
+    def queue_depth(self):
+        """Requests waiting for the model"""
+        return self.requests.qsize() + len(self.deferred)
+
+    def _next_batch(self):
+        first = self.deferred.pop(0) if self.deferred else self.requests.get()
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        for request in list(self.deferred):
+            if len(batch) >= self.max_batch_size:
+                break
+            if request.key == first.key:
+                self.deferred.remove(request)
+                batch.append(request)
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request.key == first.key:
+                batch.append(request)
+            else:
+                self.deferred.append(request)
+        return batch
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._next_batch()
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            try:
+                results = self._run_batched(batch)
+                for request, segments in zip(batch, results):
+                    request.future.set_result(segments)
+            except Exception as e:
+                print(f"Error in batched transcription: {traceback.format_exc()}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _run_batched(self, batch):
+        """Concatenate the batch and decode every voiced window of every request in one pass"""
+        options = dict(batch[0].options)
+        vad_parameters = options.pop('vad_parameters', None)
+        offsets, clip_timestamps, buffers = [], [], []
+        cursor = 0.0
+        for request in batch:
+            offsets.append(cursor)
+            for start, end in speech_clips(request.samples, vad_parameters):
+                clip_timestamps.append({"start": cursor + start, "end": cursor + end})
+            buffers.append(request.samples)
+            cursor += len(request.samples) / SAMPLE_RATE
+
+        results = [[] for _ in batch]
+        if not clip_timestamps:
+            return results
+
+        segments, info = self.batched.transcribe(
+            np.concatenate(buffers).astype(np.float32),
+            clip_timestamps=clip_timestamps,
+            vad_filter=False,
+            batch_size=self.inference_batch_size,
+            **options
+        )
+        for segment in segments:
+            owner = max(0, bisect_right(offsets, segment.start) - 1)
+            results[owner].append(shift_segment(segment, offsets[owner]))
+        return results
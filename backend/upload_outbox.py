@@ -0,0 +1,198 @@
+"""
+Upload Outbox Module
+Durable on-disk queue of archival uploads drained by background workers with retries
+"""
+
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import traceback
+import uuid
+
+
+PENDING = "pending"
+UPLOADED = "uploaded"
+FAILED = "failed"
+
+
+class UploadOutbox:
+    """
+    enqueue() writes the payload and a JSON record into directory and returns at once
+    Workers call upload_fn(path, public_id) -> url; failures are retried with full-jitter
+    exponential backoff up to max_attempts. start() picks up pending records left on disk
+    (e.g. after a crash or restart). on_update(record) is called once an upload has
+    succeeded or been given up on. Finished records (and the files of failed ones) are deleted
+    retention seconds after their last update, checked at most every prune_interval seconds.
+    """
+
+    def __init__(self, directory, upload_fn, num_workers=2, max_attempts=8, backoff_base=2.0,
+                 backoff_max=300.0, retention=7 * 24 * 3600, prune_interval=600.0, on_update=None):
+        self.directory = directory
+        self.num_workers = num_workers
+        self.upload_fn = upload_fn
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.last_pruned = time.time()
+        self.on_update = on_update
+        self.records = {}
+        self.condition = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """Reload records left on disk and start the upload workers"""
+        self._recover()
+        for index in range(self.num_workers):
+            threading.Thread(target=self._worker, name=f"upload-outbox-{index}", daemon=True).start()
+
+    def _path(self, upload_id, suffix):
+        return os.path.join(self.directory, f"{upload_id}{suffix}")
+
+    def _save(self, record):
+        """Write the record atomically so a crash never leaves a half-written JSON file"""
+        temp_path = self._path(record["uploadId"], ".json.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(temp_path, self._path(record["uploadId"], ".json"))
+
+    def _remove_files(self, record):
+        for name in (f"{record['uploadId']}.json", record["file"]):
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _expired(self, record, now):
+        return record["status"] != PENDING and now - record["updatedAt"] > self.retention
+
+    def _prune(self, now):
+        """Forget finished records past retention; called with the condition held"""
+        self.last_pruned = now
+        for upload_id, record in list(self.records.items()):
+            if self._expired(record, now):
+                del self.records[upload_id]
+                self._remove_files(record)
+
+    def _recover(self):
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    record = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable outbox record {name}: {e}")
+                continue
+            if self._expired(record, now):
+                self._remove_files(record)
+                continue
+            if record["status"] == PENDING:
+                record["nextAttemptAt"] = now
+            self.records[record["uploadId"]] = record
+        pending = sum(1 for record in self.records.values() if record["status"] == PENDING)
+        if pending:
+            print(f"Upload outbox: resuming {pending} pending uploads.")
+
+    def enqueue(self, data, public_id, suffix=".wav", meta=None):
+        """Persist data for upload; returns the upload id"""
+        upload_id = uuid.uuid4().hex
+        payload_path = self._path(upload_id, suffix)
+        with open(payload_path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(payload_path + ".tmp", payload_path)
+        now = time.time()
+        record = {
+            "uploadId": upload_id, "publicId": public_id, "file": os.path.basename(payload_path),
+            "status": PENDING, "attempts": 0, "url": None, "error": None, "meta": meta or {},
+            "createdAt": now, "updatedAt": now, "nextAttemptAt": now
+        }
+        with self.condition:
+            self._save(record)
+            self.records[upload_id] = record
+            if now - self.last_pruned > self.prune_interval:
+                self._prune(now)
+            self.condition.notify()
+        return upload_id
+
+    def get(self, upload_id):
+        with self.condition:
+            record = self.records.get(upload_id)
+            return self._public(record) if record else None
+
+    @staticmethod
+    def _public(record):
+        return {key: record[key] for key in ("uploadId", "status", "url", "attempts", "error", "meta")}
+
+    def _next_due(self):
+        """Block until some pending record is due, claim it and return it"""
+        with self.condition:
+            while True:
+                pending = [record for record in self.records.values()
+                           if record["status"] == PENDING and not record.get("claimed")]
+                now = time.time()
+                due = min(pending, key=lambda record: record["nextAttemptAt"], default=None)
+                if due is not None and due["nextAttemptAt"] <= now:
+                    due["claimed"] = True
+                    return due
+                self.condition.wait(timeout=None if due is None else due["nextAttemptAt"] - now)
+
+    def _worker(self):
+        while True:
+            record = self._next_due()
+            path = os.path.join(self.directory, record["file"])
+            try:
+                url = self.upload_fn(path, record["publicId"])
+                changes = {"status": UPLOADED, "url": url, "error": None}
+            except Exception as e:
+                print(f"Upload {record['uploadId']} failed (attempt {record['attempts'] + 1}): {e}")
+                if record["attempts"] + 1 >= self.max_attempts:
+                    print(f"Giving up on upload {record['uploadId']}: {traceback.format_exc()}")
+                    changes = {"status": FAILED, "error": str(e)}
+                else:
+                    # Full jitter, as for Gemini retries, so a recovering target isn't hit in lockstep
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** record["attempts"]))
+                    changes = {"error": str(e), "nextAttemptAt": time.time() + delay}
+
+            with self.condition:
+                record.update(changes, attempts=record["attempts"] + 1, updatedAt=time.time(), claimed=False)
+                self._save({key: value for key, value in record.items() if key != "claimed"})
+                snapshot = self._public(record)
+                self.condition.notify()
+            if record["status"] == UPLOADED and os.path.exists(path):
+                os.remove(path)
+            if record["status"] != PENDING and self.on_update:
+                self.on_update(snapshot)
+
+    def stats(self):
+        with self.condition:
+            counts = {PENDING: 0, UPLOADED: 0, FAILED: 0}
+            for record in self.records.values():
+                counts[record["status"]] += 1
+            return counts
+
+
+class LocalUploadTarget:
+    """
+    Offline stand-in for Cloudinary: copies the file into directory and returns a URL under
+    base_url; latency and failure_rate simulate a slow or flaky upstream
+    """
+
+    def __init__(self, directory, base_url, latency=0.0, failure_rate=0.0):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+        self.latency = latency
+        self.failure_rate = failure_rate
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, path, public_id):
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise ConnectionError("Local upload target transient failure")
+        name = public_id.replace("/", "_") + os.path.splitext(path)[1]
+        shutil.copyfile(path, os.path.join(self.directory, name))
+        return f"{self.base_url}/{name}"
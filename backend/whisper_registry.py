@@ -0,0 +1,114 @@
+"""
+Whisper Registry Module
+Holds several Whisper model sizes and routes each request to one by clip length, device and load
+"""
+
+import os
+
+from transcription import TranscriptionScheduler
+
+
+def whisper_config_from_env():
+    """Registry settings from environment variables (defaults keep a single 'medium' model)"""
+    return {
+        # Ordered fastest -> most accurate
+        "models": [name.strip() for name in os.getenv("WHISPER_MODELS", "medium").split(",") if name.strip()],
+        "device": os.getenv("WHISPER_DEVICE", "auto"),
+        "cpu_max_model": os.getenv("WHISPER_CPU_MAX_MODEL", ""),
+        "long_clip_seconds": float(os.getenv("WHISPER_LONG_CLIP_SECONDS", "120")),
+        "busy_queue_depth": int(os.getenv("WHISPER_BUSY_QUEUE_DEPTH", "4")),
+        "max_batch_size": int(os.getenv("WHISPER_MAX_BATCH_SIZE", "8")),
+        "max_wait_ms": int(os.getenv("WHISPER_MAX_BATCH_WAIT_MS", "50")),
+        "inference_batch_size": int(os.getenv("WHISPER_INFERENCE_BATCH_SIZE", "16")),
+    }
+
+
+def load_whisper_model(name, device="auto"):
+    """Load one Whisper size, GPU first with CPU fallback; returns (model, device)"""
+    from faster_whisper import WhisperModel
+
+    if device in ("auto", "cuda"):
+        try:
+            model = WhisperModel(name, device="cuda", compute_type="float16")
+            print(f"Whisper '{name}' model loaded successfully on GPU.")
+            return model, "cuda"
+        except Exception as e:
+            if device == "cuda":
+                raise
+            print(f"CRITICAL ERROR: Could not load Whisper '{name}' on GPU. Trying CPU fallback. {e}")
+    model = WhisperModel(name, device="cpu", compute_type="int8")
+    print(f"Whisper '{name}' model loaded successfully on CPU.")
+    return model, "cpu"
+
+
+class WhisperTier:
+    def __init__(self, name, scheduler, device):
+        self.name = name
+        self.scheduler = scheduler
+        self.device = device
+
+
+class WhisperRegistry:
+    """
+    Tiers ordered from fastest to most accurate
+    Routing starts at the most accurate tier the device allows, then steps down one tier
+    for long clips and one (or to the fastest) when the transcription queue is busy
+    """
+
+    def __init__(self, tiers, long_clip_seconds=120.0, busy_queue_depth=4, cpu_max_model="", queue_depth_fn=None):
+        if not tiers:
+            raise ValueError("WhisperRegistry needs at least one model")
+        self.tiers = tiers
+        self.queue_depth_fn = queue_depth_fn
+        self.long_clip_seconds = long_clip_seconds
+        self.busy_queue_depth = busy_queue_depth
+        self.cpu_max_model = cpu_max_model
+
+    @classmethod
+    def load(cls, config):
+        tiers = []
+        for name in config["models"]:
+            model, device = load_whisper_model(name, config["device"])
+            scheduler = TranscriptionScheduler(
+                model,
+                max_batch_size=config["max_batch_size"],
+                max_wait_ms=config["max_wait_ms"],
+                inference_batch_size=config["inference_batch_size"]
+            )
+            tiers.append(WhisperTier(name, scheduler, device))
+        return cls(tiers, long_clip_seconds=config["long_clip_seconds"],
+                   busy_queue_depth=config["busy_queue_depth"], cpu_max_model=config["cpu_max_model"])
+
+    def queue_depth(self):
+        if self.queue_depth_fn:
+            return self.queue_depth_fn()
+        return sum(tier.scheduler.queue_depth() for tier in self.tiers)
+
+    def _ceiling(self):
+        """Index of the most accurate tier allowed on this node"""
+        names = [tier.name for tier in self.tiers]
+        top = len(self.tiers) - 1
+        if self.cpu_max_model in names:
+            cpu_cap = names.index(self.cpu_max_model)
+            while top > cpu_cap and self.tiers[top].device == "cpu":
+                top -= 1
+        return top
+
+    def select(self, duration_seconds=None):
+        """Pick a tier for a clip; returns the WhisperTier"""
+        index = self._ceiling()
+        if duration_seconds is not None and duration_seconds > self.long_clip_seconds:
+            index -= 1
+        depth = self.queue_depth()
+        if depth >= 2 * self.busy_queue_depth:
+            index = 0
+        elif depth >= self.busy_queue_depth:
+            index -= 1
+        return self.tiers[max(0, index)]
+
+    def status(self):
+        return {
+            "tiers": [{"name": tier.name, "device": tier.device, "queueDepth": tier.scheduler.queue_depth(),
+                       **tier.scheduler.stats} for tier in self.tiers],
+            "queueDepth": self.queue_depth()
+        }
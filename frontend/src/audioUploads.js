@@ -0,0 +1,41 @@
+import { updateDoc } from "firebase/firestore";
+
+const UPLOADS_URL = "http://127.0.0.1:5000/uploads";
+const FIRST_POLL_MS = 2000;
+const MAX_POLL_MS = 30000;
+const MAX_WAIT_MS = 15 * 60 * 1000;
+
+// Current state of a background archival upload, or null if the backend doesn't know it
+export const fetchAudioUpload = async (uploadId) => {
+  const res = await fetch(`${UPLOADS_URL}/${uploadId}`);
+  if (res.status === 404) return null;
+  return res.json();
+};
+
+// Poll with backoff until the upload has a URL; null once it failed, vanished or took too long
+export const waitForAudioURL = async (uploadId) => {
+  const deadline = Date.now() + MAX_WAIT_MS;
+  let delay = FIRST_POLL_MS;
+  while (Date.now() < deadline) {
+    try {
+      const upload = await fetchAudioUpload(uploadId);
+      if (!upload || upload.status === "failed") return null;
+      if (upload.status === "uploaded") return upload.url;
+    } catch (err) {
+      // transient network error, keep polling
+    }
+    await new Promise((resolve) => setTimeout(resolve, delay));
+    delay = Math.min(MAX_POLL_MS, delay * 2);
+  }
+  return null;
+};
+
+// Fill in audioURL on a saved session once its recording has been archived
+export const resolveSessionAudio = async (docRef, session) => {
+  if (session.audioURL || !session.audioUpload?.uploadId) return session.audioURL || null;
+  const audioURL = await waitForAudioURL(session.audioUpload.uploadId);
+  if (audioURL) {
+    await updateDoc(docRef, { audioURL, "audioUpload.status": "uploaded" });
+  }
+  return audioURL;
+};
@@ -3,6 +3,7 @@ import { db } from '../firebase';
 import { collection, addDoc, query, where, onSnapshot, orderBy } from 'firebase/firestore';
 import { useAuth } from '../context/AuthContext';
 import Dashboard from '../components/Dashboard';
+import { resolveSessionAudio } from '../audioUploads';
 import PracticeModal from '../components/PracticeModal';
 
 const DashboardPage = () => {
@@ -35,8 +36,10 @@ const DashboardPage = () => {
       categoryId: null, // Category feature removed
     };
     try {
-      await addDoc(collection(db, 'sessions'), sessionToSave);
+      const docRef = await addDoc(collection(db, 'sessions'), sessionToSave);
       console.log("New session successfully saved to Firestore.");
+      // The recording is archived in the background; add its URL to the session when it's ready
+      resolveSessionAudio(docRef, sessionToSave).catch((e) => console.error("Error saving audio URL: ", e));
     } catch (e) {
       console.error("Error adding document: ", e);
     }
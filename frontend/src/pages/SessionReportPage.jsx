@@ -3,6 +3,7 @@ import { useParams, Link } from 'react-router-dom';
 import { db } from '../firebase';
 import { doc, getDoc } from 'firebase/firestore';
 import RadialProgress from '../components/RadialProgress'; // Import RadialProgress
+import { resolveSessionAudio } from '../audioUploads';
 
 // ---------- Reusable ReportCard Component ----------
 const ReportCard = ({ title, children, color = 'gray' }) => {
@@ -51,6 +52,10 @@ const SessionReportPage = () => {
           const data = { id: docSnap.id, ...docSnap.data() };
           console.log("✅ Session fetched successfully:", data);
           setSessionData(data);
+          // Sessions saved before their upload finished pick up the URL here
+          resolveSessionAudio(docRef, data)
+            .then((audioURL) => audioURL && !data.audioURL && setSessionData({ ...data, audioURL }))
+            .catch((e) => console.error("Error resolving recording URL:", e));
         } else {
           console.warn("⚠️ No session found with ID:", sessionId);
           setError("Session not found in the database.");